@@ -1,3 +1,28 @@
-from mdscript.runner import Runner
-from mdscript.config import MDScriptConfig
-from mdscript.base_transformer import BaseTransformer
+import importlib
+from typing import Any, Dict, TYPE_CHECKING
+
+__version__ = '0.1.3.1'
+# Must be kept in sync with the version of the setup.py, since it is part of the keys of the tests results cache.
+
+if TYPE_CHECKING:
+    from mdscript.runner import Runner
+    from mdscript.config import MDScriptConfig
+    from mdscript.base_transformer import BaseTransformer
+
+
+_LAZY_ATTRIBUTES_MODULES: Dict[str, str] = {
+    'Runner': 'mdscript.runner',
+    'MDScriptConfig': 'mdscript.config',
+    'BaseTransformer': 'mdscript.base_transformer'
+}
+# The modules are only imported when one of their attributes is first accessed, so that importing a light
+# module of the package (like the sample_worker started by the tests) does not import the whole Runner.
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES_MODULES.get(name, None)
+    if module_name is None:
+        raise AttributeError(f"module 'mdscript' has no attribute '{name}'")
+    attribute_value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = attribute_value
+    return attribute_value
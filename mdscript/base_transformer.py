@@ -3,15 +3,20 @@ import logging
 
 from mdscript.runner import Runner
 from abc import abstractmethod
-from typing import Optional, Any
+from typing import Optional, Any, Set, Tuple
 
 
 class BaseTransformer:
+    cacheable: bool = False
+    # A transformer can only be cacheable if its output depends only on its attribute
+    # and on the files it registered as dependencies with the register_dependency function.
+
     def __init__(self, runner: Runner, source_filepath: str, attribute: Optional[str]):
         self.runner = runner
         self.source_filepath = source_filepath
         self._attribute = attribute
         self._evaluated_attribute: Optional[Any] = None
+        self._registered_dependencies: Set[str] = set()
 
     @property
     def attribute(self) -> Optional[Any]:
@@ -27,6 +32,49 @@ class BaseTransformer:
                 self._evaluated_attribute = None
         return self._evaluated_attribute
 
+    @property
+    def cache_key(self) -> Tuple[str, str]:
+        return type(self).__name__, self._attribute or ''
+
+    def register_dependency(self, dependency_path: str):
+        self.runner.files_dependencies.add_dependency(parent_filepath=self.source_filepath, dependency_path=dependency_path)
+        self._registered_dependencies.add(dependency_path)
+
+    def _get_cached_content(self) -> Optional[str]:
+        if self.cacheable is not True or self.runner.transformers_cache is None:
+            return None
+        cached_entry = self.runner.transformers_cache.get(key=self.cache_key)
+        if cached_entry is None:
+            return None
+        for dependency_path in cached_entry.dependencies_paths:
+            self.register_dependency(dependency_path=dependency_path)
+        # Even when retrieved from the cache, the dependencies needs to be registered for the current source file.
+        return cached_entry.content
+
+    def _set_cached_content(self, transformed_content: str):
+        if self.cacheable is not True or self.runner.transformers_cache is None:
+            return
+        self.runner.transformers_cache.set(
+            key=self.cache_key, content=transformed_content, dependencies_paths=self._registered_dependencies,
+            validation_paths=self.runner.files_dependencies.get_transitive_dependencies(self._registered_dependencies)
+        )
+
+    def render(self) -> str:
+        cached_content: Optional[str] = self._get_cached_content()
+        if cached_content is not None:
+            return cached_content
+        transformed_content = self.transform()
+        self._set_cached_content(transformed_content=transformed_content)
+        return transformed_content
+
+    async def arender(self) -> str:
+        cached_content: Optional[str] = self._get_cached_content()
+        if cached_content is not None:
+            return cached_content
+        transformed_content = await self.atransform()
+        self._set_cached_content(transformed_content=transformed_content)
+        return transformed_content
+
     @abstractmethod
     def transform(self) -> str:
         raise Exception(f"transform function must be implemented")
@@ -35,3 +83,15 @@ class BaseTransformer:
         # The implementation of the test function is optional, hence the missing @abstractmethod.
         # If the test function is not implemented, we return True so that it will be considered as passed.
         return True
+
+    async def atransform(self) -> str:
+        # Used when the Runner is built with asyncio. By default, the synchronous transform function is run
+        # in a thread, so that the blocks of a file are still rendered concurrently. The transformers whose
+        # work can be awaited can override this function instead of blocking one of the threads.
+        return await self.runner.run_blocking(self.transform)
+
+    async def atest(self) -> bool:
+        # The tests of all the blocks of a build are run concurrently, so a transformer whose test
+        # function is not thread safe must override this function, for example to run its test in
+        # a subprocess, and must not rely on anything that is shared by the whole Runner process.
+        return await self.runner.run_blocking(self.test)
@@ -0,0 +1,249 @@
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Callable, Dict, List, Optional, NamedTuple
+
+import click
+
+from mdscript.config import MDScriptConfig
+from mdscript.daemon import MDScriptDaemon
+from mdscript.runner import Runner
+from mdscript.transformers import FileImportTransformer, FileTemplateTransformer
+
+
+class SyntheticTree(NamedTuple):
+    root_dirpath: str
+    docs_dirpath: str
+    sources_filepaths: List[str]
+    leaf_parts_filepaths: List[str]
+
+
+PARAGRAPH = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore.\n"
+
+
+def generate_synthetic_tree(root_dirpath: str, num_files: int, blocks_per_file: int, include_depth: int, num_parts: int) -> SyntheticTree:
+    docs_dirpath = os.path.join(root_dirpath, 'docs')
+    parts_dirpath = os.path.join(root_dirpath, 'docs_parts')
+    os.makedirs(docs_dirpath)
+    os.makedirs(parts_dirpath)
+
+    # The parts of each level are including a part of the next level, so that every
+    # block of a source file is rendered through a chain of include_depth files.
+    levels_parts_filepaths: List[List[str]] = [
+        [os.path.join(parts_dirpath, f"level_{level}_part_{part_index}.md") for part_index in range(num_parts)]
+        for level in range(max(include_depth, 1))
+    ]
+    for level, parts_filepaths in enumerate(levels_parts_filepaths):
+        for part_index, part_filepath in enumerate(parts_filepaths):
+            with open(part_filepath, 'w+') as part_file:
+                part_file.write(f"#### Part {part_index} of level {level}\n{PARAGRAPH * 3}")
+                if level + 1 < len(levels_parts_filepaths):
+                    part_file.write(f"{{{{file::{levels_parts_filepaths[level + 1][part_index]}::}}}}\n")
+
+    sources_filepaths: List[str] = list()
+    for file_index in range(num_files):
+        source_filepath = os.path.join(docs_dirpath, f"__doc_{file_index}.md")
+        with open(source_filepath, 'w+') as source_file:
+            source_file.write(f"# Document {file_index}\n")
+            for block_index in range(blocks_per_file):
+                part_filepath = levels_parts_filepaths[0][(file_index + block_index) % num_parts]
+                source_file.write(f"{PARAGRAPH}{{{{file::{part_filepath}::}}}}\n")
+        sources_filepaths.append(source_filepath)
+
+    return SyntheticTree(
+        root_dirpath=root_dirpath, docs_dirpath=docs_dirpath,
+        sources_filepaths=sources_filepaths, leaf_parts_filepaths=levels_parts_filepaths[-1]
+    )
+
+
+def make_runner(docs_dirpath: str, render_workers: Optional[int], build_manifest_filename: Optional[str] = None, **config_kwargs) -> Runner:
+    return Runner(
+        MDScriptConfig(
+            transformers={'file': FileImportTransformer, 'template': FileTemplateTransformer},
+            build_manifest_filename=build_manifest_filename, render_workers=render_workers, **config_kwargs
+        ),
+        base_dirpath=docs_dirpath
+    )
+
+
+RENDER_MODES: Dict[str, dict] = {
+    'threads': {'render_workers': 4},
+    'processes': {'render_workers': 4, 'use_render_processes': True},
+    'streaming': {'streaming_threshold_bytes': 0, 'streaming_chunk_size': 7},
+    'asyncio': {'use_asyncio': True},
+    'asyncio_streaming': {'use_asyncio': True, 'streaming_threshold_bytes': 0, 'streaming_chunk_size': 7}
+}
+
+
+def read_outputs(tree: SyntheticTree) -> Dict[str, str]:
+    outputs: Dict[str, str] = dict()
+    for source_filepath in tree.sources_filepaths:
+        output_filepath = os.path.join(os.path.dirname(source_filepath), os.path.basename(source_filepath)[2:])
+        with open(output_filepath, 'r') as output_file:
+            outputs[output_filepath] = output_file.read()
+    return outputs
+
+
+def verify_render_modes(tree: SyntheticTree):
+    # Every render mode must give the same outputs as the synchronous Runner, otherwise the timings are meaningless.
+    make_runner(tree.docs_dirpath, render_workers=1).build()
+    expected_outputs = read_outputs(tree)
+    for mode_name, config_kwargs in RENDER_MODES.items():
+        for output_filepath in expected_outputs.keys():
+            os.remove(output_filepath)
+        status_code = make_runner(tree.docs_dirpath, **{'render_workers': 1, **config_kwargs}).build()
+        if status_code != 0 or read_outputs(tree) != expected_outputs:
+            raise click.ClickException(f"The {mode_name} render mode did not give the same outputs as the synchronous Runner")
+
+
+def verify_daemon_paths(tree: SyntheticTree):
+    # The paths sent to the daemon can be spelled differently than the scan of the base_dirpath, like absolute paths,
+    # but they must render the registered source, instead of adding a second manifest entry for the same file.
+    runner = make_runner(os.path.relpath(tree.docs_dirpath), render_workers=1, build_manifest_filename='.benchmark_manifest.json')
+    runner.build()
+    daemon = MDScriptDaemon(runner=runner, host='127.0.0.1', port=0)
+    daemon.start()
+    try:
+        request = urllib.request.Request(
+            f"http://{daemon.host}:{daemon.port}/build", method='POST',
+            data=json.dumps({'paths': [os.path.abspath(tree.sources_filepaths[0])]}).encode('utf-8')
+        )
+        with urllib.request.urlopen(request) as response:
+            build_data: dict = json.loads(response.read().decode('utf-8'))
+    finally:
+        daemon.stop()
+    expected_filepath = os.path.join(os.path.relpath(tree.docs_dirpath), os.path.basename(tree.sources_filepaths[0]))
+    if build_data['rendered'] != [expected_filepath] or os.path.abspath(expected_filepath) in runner.files_dependencies.parents_to_dependencies:
+        raise click.ClickException(f"The daemon did not render the absolute path as the registered {expected_filepath}, got {build_data['rendered']}")
+
+
+def measure(function: Callable[[], None], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    durations: List[float] = list()
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start_time = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start_time)
+    return {
+        'runs': len(durations), 'min': min(durations), 'median': statistics.median(durations),
+        'mean': statistics.mean(durations), 'max': max(durations)
+    }
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_cold_starts(repeat: int) -> Dict[str, Dict[str, float]]:
+    # Each run starts a new interpreter, so that nothing is already imported, like when starting a one-shot build.
+    mdscript_parent_dirpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    commands = {
+        'cold_start_import': [sys.executable, '-c', 'import mdscript.runner, mdscript.transformers'],
+        'cold_start_cli': [sys.executable, '-m', 'mdscript.cli', '--help']
+    }
+    return {
+        benchmark_name: measure(lambda: subprocess.run(
+            command, cwd=mdscript_parent_dirpath, check=True, stdout=subprocess.DEVNULL
+        ), repeat=repeat) for benchmark_name, command in commands.items()
+    }
+
+
+def run_benchmarks(tree: SyntheticTree, repeat: int, render_workers: Optional[int]) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = dict()
+
+    # A new Runner is created for each full build, so that its transformers cache starts empty.
+    results['full_build'] = measure(lambda: make_runner(tree.docs_dirpath, render_workers)._run_in_folder(
+        dirpath=tree.docs_dirpath, run_tests=False
+    ), repeat=repeat)
+    # The threads are limited by the GIL since the rendering is bound by the cpu, so only the processes can scale with the workers.
+    results['full_build_processes'] = measure(lambda: make_runner(tree.docs_dirpath, render_workers, use_render_processes=True)._run_in_folder(
+        dirpath=tree.docs_dirpath, run_tests=False
+    ), repeat=repeat)
+
+    manifest_filename = '.benchmark_manifest.json'
+    make_runner(tree.docs_dirpath, render_workers, manifest_filename)._run_in_folder(dirpath=tree.docs_dirpath, run_tests=False)
+    results['up_to_date_build'] = measure(lambda: make_runner(tree.docs_dirpath, render_workers, manifest_filename)._run_in_folder(
+        dirpath=tree.docs_dirpath, run_tests=False
+    ), repeat=repeat)
+
+    runner = make_runner(tree.docs_dirpath, render_workers)
+    runner._run_in_folder(dirpath=tree.docs_dirpath, run_tests=False)
+    results['single_file_rebuild_cached'] = measure(lambda: runner._run_with_filepath(
+        source_filepath=tree.sources_filepaths[0], run_test=False
+    ), repeat=repeat)
+
+    def invalidate_leaf_part():
+        runner.transformers_cache.invalidate_dependency(tree.leaf_parts_filepaths[0])
+    results['single_file_rebuild_after_leaf_change'] = measure(lambda: runner._run_with_filepath(
+        source_filepath=tree.sources_filepaths[0], run_test=False
+    ), repeat=repeat, setup=invalidate_leaf_part)
+
+    # The fan-out is what the watcher computes for each modified file, before pushing the files to render.
+    results['dependencies_fan_out'] = measure(lambda: runner.files_dependencies.get_affected_parents(
+        filepath=tree.leaf_parts_filepaths[0]
+    ), repeat=repeat)
+    results['dependencies_fan_out']['affected_files'] = len(runner.files_dependencies.get_affected_parents(
+        filepath=tree.leaf_parts_filepaths[0]
+    ))
+    return results
+
+
+@click.command()
+@click.option('--files', '-f', 'num_files', type=int, default=200)
+@click.option('--blocks', '-b', 'blocks_per_file', type=int, default=10)
+@click.option('--depth', '-d', 'include_depth', type=int, default=3)
+@click.option('--parts', '-p', 'num_parts', type=int, default=20)
+@click.option('--repeat', '-r', type=int, default=5)
+@click.option('--workers', '-w', 'render_workers', type=int, default=1)
+@click.option('--output', '-o', 'output_filepath', type=str, default=None)
+def run_benchmark_suite(
+        num_files: int, blocks_per_file: int, include_depth: int, num_parts: int,
+        repeat: int, render_workers: int, output_filepath: Optional[str]
+):
+    parameters = {
+        'files': num_files, 'blocks_per_file': blocks_per_file, 'include_depth': include_depth,
+        'parts': num_parts, 'repeat': repeat, 'render_workers': render_workers
+    }
+    root_dirpath = tempfile.mkdtemp(prefix='mdscript_benchmark_')
+    try:
+        tree = generate_synthetic_tree(
+            root_dirpath=root_dirpath, num_files=num_files, blocks_per_file=blocks_per_file,
+            include_depth=include_depth, num_parts=num_parts
+        )
+        verify_render_modes(tree=tree)
+        verify_daemon_paths(tree=tree)
+        results = run_benchmarks(tree=tree, repeat=repeat, render_workers=render_workers)
+        results.update(measure_cold_starts(repeat=repeat))
+    finally:
+        shutil.rmtree(root_dirpath, ignore_errors=True)
+
+    benchmark_data = {
+        'commit': get_git_commit(), 'python': sys.version.split()[0], 'platform': platform.platform(),
+        'parameters': parameters, 'results': results
+    }
+    # The parameters and the commit are stored with the results, so that the json files
+    # of multiple commits can be compared, as long as they were generated with the same parameters.
+    for benchmark_name, benchmark_results in results.items():
+        click.echo(f"{benchmark_name:<40} median {benchmark_results['median'] * 1e3:>10.2f} ms   min {benchmark_results['min'] * 1e3:>10.2f} ms")
+    if output_filepath is not None:
+        with open(output_filepath, 'w+') as output_file:
+            json.dump(benchmark_data, output_file, indent=2)
+        click.echo(f"Results written to {output_filepath}")
+
+
+if __name__ == '__main__':
+    run_benchmark_suite()
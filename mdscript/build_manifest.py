@@ -0,0 +1,135 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional, List, Iterable, Tuple
+
+from mdscript.git_dirty_set import GitState
+from mdscript.output_writer import HASH_READ_CHUNK_SIZE
+
+
+class BuildManifest:
+    VERSION = 2
+    GIT_STATE_BUILD = 'build'
+    GIT_STATE_TESTS = 'tests'
+
+    def __init__(self, manifest_filepath: str):
+        self.manifest_filepath = manifest_filepath
+        self._entries: Dict[str, dict] = dict()
+        self._git_states: Dict[str, dict] = dict()
+        # The git commit of the last build, and of the last build that ran all the tests successfully.
+        self._hashes_cache: Dict[str, Tuple[int, int, str]] = dict()
+        self._has_pending_changes = False
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.manifest_filepath):
+            return
+        try:
+            with open(self.manifest_filepath, 'r') as manifest_file:
+                manifest_data: dict = json.load(manifest_file)
+            if manifest_data.get('version', None) == self.VERSION:
+                self._entries = manifest_data.get('entries', dict())
+                self._git_states = manifest_data.get('git_states', dict())
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load the build manifest at {self.manifest_filepath} : {e}")
+            # A corrupted manifest is not an error, we will simply re-render everything and write a new one.
+
+    def save(self):
+        if self._has_pending_changes is not True:
+            return
+        with open(self.manifest_filepath, 'w+') as manifest_file:
+            json.dump({
+                'version': self.VERSION, 'entries': self._entries, 'git_states': self._git_states
+            }, manifest_file, indent=2, sort_keys=True)
+        self._has_pending_changes = False
+
+    def hash_filepath(self, filepath: str) -> Optional[str]:
+        try:
+            file_stat = os.stat(filepath)
+        except OSError:
+            return None
+
+        # The same dependencies (like the docs_parts table rows) are shared by a lot of sources, so we
+        # only hash a file again if its modification time or size changed since we last hashed it.
+        cached_hash = self._hashes_cache.get(filepath, None)
+        if cached_hash is not None and cached_hash[0] == file_stat.st_mtime_ns and cached_hash[1] == file_stat.st_size:
+            return cached_hash[2]
+
+        file_hash_object = hashlib.sha1()
+        with open(filepath, 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_READ_CHUNK_SIZE), b''):
+                file_hash_object.update(chunk)
+        file_hash = file_hash_object.hexdigest()
+        self._hashes_cache[filepath] = (file_stat.st_mtime_ns, file_stat.st_size, file_hash)
+        return file_hash
+
+    def is_up_to_date(self, source_filepath: str, output_filepath: str) -> bool:
+        entry: Optional[dict] = self._entries.get(source_filepath, None)
+        if entry is None or entry['output_filepath'] != output_filepath:
+            return False
+        if self.hash_filepath(source_filepath) != entry['source_hash']:
+            return False
+        if self.hash_filepath(output_filepath) != entry['output_hash']:
+            # If the output has been deleted or modified by hand, it must be rendered again.
+            return False
+        for dependency_path, dependency_hash in entry['dependencies'].items():
+            if self.hash_filepath(dependency_path) != dependency_hash:
+                return False
+        return True
+
+    def get_recorded_paths(self, source_filepath: str, output_filepath: str) -> Optional[List[str]]:
+        entry: Optional[dict] = self._entries.get(source_filepath, None)
+        if entry is None or entry['output_filepath'] != output_filepath:
+            return None
+        return [source_filepath, output_filepath, *entry['dependencies'].keys()]
+
+    def get_git_state(self, kind: str, environment: Dict[str, Optional[str]]) -> Optional[GitState]:
+        git_state_data: Optional[dict] = self._git_states.get(kind, None)
+        if git_state_data is None or git_state_data['environment'] != environment:
+            # The outputs and the tests results also depend on the installed packages, and not only on the files.
+            return None
+        return GitState(commit=git_state_data['commit'], dirty_paths=git_state_data['dirty_paths'])
+
+    def record_git_state(self, kind: str, git_state: GitState, environment: Dict[str, Optional[str]]):
+        git_state_data = {'commit': git_state.commit, 'dirty_paths': git_state.dirty_paths, 'environment': environment}
+        if self._git_states.get(kind, None) != git_state_data:
+            self._git_states[kind] = git_state_data
+            self._has_pending_changes = True
+
+    def get_dependencies_edges(self, source_filepath: str) -> List[Tuple[str, str]]:
+        entry: Optional[dict] = self._entries.get(source_filepath, None)
+        return [tuple(edge) for edge in entry['dependencies_edges']] if entry is not None else list()
+
+    def record(self, source_filepath: str, output_filepath: str, dependencies_edges: Iterable[Tuple[str, str]]):
+        dependencies_edges: List[Tuple[str, str]] = sorted(dependencies_edges)
+        # The edges are kept alongside the hashes, so that the dependencies of the dependencies of
+        # a file can be registered again with the right parents when the file is not rendered.
+        entry = {
+            'output_filepath': output_filepath,
+            'source_hash': self.hash_filepath(source_filepath),
+            'output_hash': self.hash_filepath(output_filepath),
+            'dependencies': {
+                dependency_path: self.hash_filepath(dependency_path)
+                for parent_path, dependency_path in dependencies_edges
+            },
+            'dependencies_edges': [list(edge) for edge in dependencies_edges]
+        }
+        if self._entries.get(source_filepath, None) != entry:
+            # A render that did not change anything must not cause the manifest to be written again.
+            self._entries[source_filepath] = entry
+            self._has_pending_changes = True
+
+    def discard(self, source_filepath: str):
+        if self._entries.pop(source_filepath, None) is not None:
+            self._has_pending_changes = True
+
+    def retain(self, source_filepaths: Iterable[str]):
+        # The entries of the sources that have been deleted, or that were recorded with another spelling of their
+        # path, are never used again, since the builds only look up the sources found in the base_dirpath.
+        retained_entries: Dict[str, dict] = {
+            source_filepath: self._entries[source_filepath] for source_filepath in source_filepaths if source_filepath in self._entries
+        }
+        if len(retained_entries) != len(self._entries):
+            self._entries = retained_entries
+            self._has_pending_changes = True
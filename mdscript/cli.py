@@ -1,14 +1,84 @@
+import importlib.util
+import logging
+import os
+import sys
+from typing import Any, Optional, Tuple
+
 import click
-from mdscript.runner import Runner
-# todo: deprecated
 
-@click.command()
-@click.option('--dirpath', '-d', prompt="Dirpath", type=str)
-@click.option('--tests', '-t', prompt="Run tests ?", is_flag=True)
-def run(dirpath: str, tests: bool):
-    run_api(dirpath=dirpath, run_tests=tests)
 
-def run_api(dirpath: str, run_tests: bool):
-    runner = Runner()
-    runner.run_watch(dirpath=dirpath, run_tests=run_tests)
+def load_config_file(config_filepath: str) -> Tuple[Any, Optional[str]]:
+    # The config file is a python file defining a config variable holding an MDScriptConfig, and optionally a
+    # base_dirpath variable. It is executed as a module named mdscript_config, so that its own Runner is not
+    # started if it is guarded behind an if __name__ == '__main__' condition.
+    if not os.path.isfile(config_filepath):
+        raise click.ClickException(f"No config file found at {config_filepath}")
+    module_spec = importlib.util.spec_from_file_location('mdscript_config', config_filepath)
+    config_module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(config_module)
+
+    config = getattr(config_module, 'config', None)
+    if config is None:
+        raise click.ClickException(f"The config file {config_filepath} must define a config variable")
+    return config, getattr(config_module, 'base_dirpath', None)
+
+
+def make_runner(config_filepath: str, dirpath: Optional[str], force_tests: bool = False):
+    config, config_base_dirpath = load_config_file(config_filepath=config_filepath)
+    if force_tests is True:
+        config.force_tests = True
+    base_dirpath: Optional[str] = dirpath or config_base_dirpath
+    if base_dirpath is None:
+        raise click.ClickException("The dirpath must be specified, either with --dirpath or in the config file")
+
+    from mdscript.runner import Runner
+    return Runner(config, base_dirpath=base_dirpath)
+
+
+@click.group()
+@click.option('--config', '-c', 'config_filepath', type=str, default='mdscript_config.py')
+@click.option('--dirpath', '-d', type=str, default=None)
+@click.pass_context
+def cli(context: click.Context, config_filepath: str, dirpath: Optional[str]):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    context.obj = {'config_filepath': config_filepath, 'dirpath': dirpath}
+
+
+@cli.command()
+@click.option('--tests', '-t', is_flag=True)
+@click.option('--force', '-f', is_flag=True, help="Run all the tests again, instead of using the cached results of the unchanged ones.")
+@click.pass_context
+def build(context: click.Context, tests: bool, force: bool):
+    # One-shot commands never start the watcher, so they do not import watchdog.
+    sys.exit(make_runner(**context.obj, force_tests=force).build(run_tests=tests))
+
+
+@cli.command()
+@click.option('--tests', '-t', is_flag=True)
+@click.option('--force', '-f', is_flag=True, help="Run all the tests again, instead of using the cached results of the unchanged ones.")
+@click.pass_context
+def check(context: click.Context, tests: bool, force: bool):
+    sys.exit(make_runner(**context.obj, force_tests=force).check(run_tests=tests))
+
+
+@cli.command()
+@click.option('--tests', '-t', is_flag=True)
+@click.option('--force', '-f', is_flag=True, help="Run all the tests again, instead of using the cached results of the unchanged ones.")
+@click.pass_context
+def watch(context: click.Context, tests: bool, force: bool):
+    runner = make_runner(**context.obj, force_tests=force)
+    if tests is True:
+        runner.start_with_tests()
+    else:
+        runner.start()
+
+
+@cli.command()
+@click.option('--no-watch', is_flag=True)
+@click.pass_context
+def daemon(context: click.Context, no_watch: bool):
+    make_runner(**context.obj).start_daemon(watch=not no_watch)
+
 
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,67 @@
+import os
+import re
+import threading
+from typing import Dict, List, Mapping, Optional, NamedTuple, Tuple
+
+from mdscript.content_store import ContentStore
+
+
+PLACEHOLDER_PATTERN = re.compile(r'{{([A-Za-z_][A-Za-z0-9_]*)}}')
+# Only matches identifiers, so that the transformers blocks like {{file::...::}} of a template are left untouched.
+
+
+class CompiledTemplate(NamedTuple):
+    segments: Tuple[str, ...]
+    slots: Tuple[str, ...]
+    # The segments are the literal parts of the template, and there is always one more segment than slots.
+
+    @property
+    def placeholders(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(self.slots))
+
+    def render(self, values: Mapping[str, str], template_filepath: str) -> str:
+        missing_placeholders: List[str] = [placeholder for placeholder in self.placeholders if placeholder not in values]
+        if len(missing_placeholders) > 0:
+            raise Exception(f"Missing values for the placeholders {missing_placeholders} of the template {template_filepath}")
+
+        rendered_parts: List[str] = [self.segments[0]]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values[slot]
+            if not isinstance(value, str):
+                raise Exception(f"Value of {slot} for the template {template_filepath} must be of str type, got {type(value)}")
+            # The values are inserted as they are, they are never interpreted as regex replacement strings.
+            rendered_parts.append(value)
+            rendered_parts.append(segment)
+        return ''.join(rendered_parts)
+
+
+def compile_template(template_content: str) -> CompiledTemplate:
+    segments: List[str] = list()
+    slots: List[str] = list()
+    last_placeholder_end: int = 0
+    for match in PLACEHOLDER_PATTERN.finditer(template_content):
+        segments.append(template_content[last_placeholder_end:match.start()])
+        slots.append(match[1])
+        last_placeholder_end = match.end()
+    segments.append(template_content[last_placeholder_end:])
+    return CompiledTemplate(segments=tuple(segments), slots=tuple(slots))
+
+
+class CompiledTemplatesCache:
+    def __init__(self, content_store: ContentStore):
+        self.content_store = content_store
+        self._compiled_templates: Dict[str, Tuple[int, int, CompiledTemplate]] = dict()
+        self._lock = threading.Lock()
+
+    def get(self, template_filepath: str) -> CompiledTemplate:
+        template_stat = os.stat(template_filepath)
+        with self._lock:
+            cached_template: Optional[Tuple[int, int, CompiledTemplate]] = self._compiled_templates.get(template_filepath, None)
+        if cached_template is not None and cached_template[0] == template_stat.st_mtime_ns and cached_template[1] == template_stat.st_size:
+            return cached_template[2]
+
+        # A template is only read and parsed again when its modification time or size changed.
+        compiled_template = compile_template(template_content=self.content_store.read_text(template_filepath))
+        with self._lock:
+            self._compiled_templates[template_filepath] = (template_stat.st_mtime_ns, template_stat.st_size, compiled_template)
+        return compiled_template
@@ -1,7 +1,142 @@
+import fnmatch
+import os
+import re
 from mdscript.base_transformer import BaseTransformer
-from typing import Dict
+from typing import Dict, Optional, NamedTuple, Iterator, Pattern, Tuple
+
+
+class TransformerBlock(NamedTuple):
+    name: str
+    attribute: str
+    start: int
+    end: int
+
+
+DEFAULT_WATCH_IGNORE_PATTERNS: Tuple[str, ...] = (
+    '__pycache__', '*/__pycache__/*', '*.py[cod]', '.git', '*/.git/*', 'node_modules', '*/node_modules/*',
+    '*.swp', '*.swx', '.#*', '#*#', '*.tmp', '.DS_Store', '.mdscript_*'
+)
 
 
 class MDScriptConfig:
-    def __init__(self, transformers: Dict[str, type(BaseTransformer)]):
+    def __init__(
+            self, transformers: Dict[str, type(BaseTransformer)],
+            build_manifest_filename: Optional[str] = '.mdscript_manifest.json',
+            render_workers: Optional[int] = 1,
+            use_render_processes: bool = False,
+            transformers_cache_size: int = 512,
+            watch_debounce_seconds: float = 0.1,
+            watch_max_delay_seconds: float = 1.0,
+            profile: bool = False,
+            profile_trace_filepath: Optional[str] = None,
+            streaming_threshold_bytes: Optional[int] = 8 * 1024 * 1024,
+            streaming_chunk_size: int = 256 * 1024,
+            use_asyncio: bool = False,
+            daemon_host: str = '127.0.0.1',
+            daemon_port: int = 4180,
+            tests_results_cache_filename: Optional[str] = '.mdscript_tests_cache.json',
+            force_tests: bool = False,
+            watch_ignore_patterns: Tuple[str, ...] = DEFAULT_WATCH_IGNORE_PATTERNS,
+            use_git_dirty_set: bool = True
+    ):
         self.transformers = transformers
+        self.build_manifest_filename = build_manifest_filename
+        # The build manifest is stored in the base_dirpath of the Runner. Set it to None to disable the
+        # incremental builds, and always re-render all the files when starting the Runner.
+        self.render_workers = render_workers
+        # Number of threads used to render the files when building a folder. None will use one thread per cpu core.
+        self.use_render_processes = use_render_processes
+        # The rendering is bound by the cpu, so the threads are limited by the GIL, and do not scale with the number of
+        # cores. The folder builds can use a pool of render_workers processes instead, where each process has its own
+        # transformers cache, so the parts included by many files are rendered once per process instead of once.
+        self.transformers_cache_size = transformers_cache_size
+        # Maximum number of transformers outputs kept in memory. Set it to 0 to disable the transformers cache.
+        self.watch_debounce_seconds = watch_debounce_seconds
+        self.watch_max_delay_seconds = watch_max_delay_seconds
+        # The watcher renders the modified files once no new event has been received during the debounce
+        # window, and at most after the max delay, even if the files are continuously being modified.
+        self.profile = profile
+        self.profile_trace_filepath = profile_trace_filepath
+        # When profiling, a summary of the timings is logged when the Runner stops, and if a trace filepath
+        # is specified, all the recorded spans are exported to it in the Chrome trace-event format.
+        self.streaming_threshold_bytes = streaming_threshold_bytes
+        self.streaming_chunk_size = streaming_chunk_size
+        # The sources bigger than the threshold are read and rendered by chunks, and their output is written
+        # as it is rendered, instead of holding the whole file in memory. Set it to None to never stream.
+        self.use_asyncio = use_asyncio
+        # Builds the files, and the blocks of each file, concurrently with asyncio, using the atransform and atest
+        # functions of the transformers. The synchronous transformers are run in a pool of render_workers threads.
+        self.daemon_host = daemon_host
+        self.daemon_port = daemon_port
+        # Address of the http api of the Runner when started as a daemon. Use the port 0 to let the os pick a free port.
+        self.tests_results_cache_filename = tests_results_cache_filename
+        self.force_tests = force_tests
+        # The results of the tests are stored in the base_dirpath of the Runner, and a test is only run again when
+        # its inputs changed. Set the filename to None to disable the cache, or force_tests to True to bypass it.
+        self.watch_ignore_patterns = watch_ignore_patterns
+        # Glob patterns of the files whose events are ignored by the watcher, matched against both their path and their
+        # filename. The manifest and the tests cache are always ignored, since they are written by the Runner itself.
+        self.use_git_dirty_set = use_git_dirty_set
+        # The build manifest records the git commit of the last build, and when the base_dirpath is in a git repository,
+        # only the files affected by the paths changed since that commit are rendered, without checking the others.
+        self._watch_ignore_pattern: Optional[Pattern] = None
+        self._watch_ignore_pattern_globs: Optional[Tuple[str, ...]] = None
+        self._transformers_pattern: Optional[Pattern] = None
+        self._transformers_opener_pattern: Optional[Pattern] = None
+        self._transformers_openers: Tuple[str, ...] = tuple()
+        self._transformers_pattern_names: Optional[Tuple[str, ...]] = None
+
+    @property
+    def transformers_pattern(self) -> Pattern:
+        transformers_names: Tuple[str, ...] = tuple(self.transformers.keys())
+        if self._transformers_pattern is None or self._transformers_pattern_names != transformers_names:
+            # The longest names are placed first in the alternation, so that a transformer name that is
+            # the prefix of another one (like 'file' and 'file_raw') will never shadow the longer name.
+            transformers_names_selectors: str = '|'.join(
+                re.escape(name) for name in sorted(transformers_names, key=len, reverse=True)
+            )
+            self._transformers_pattern = re.compile(r'{{(' + transformers_names_selectors + r')::(.*?)::}}', flags=re.DOTALL)
+            self._transformers_opener_pattern = re.compile(r'{{(?:' + transformers_names_selectors + r')::')
+            self._transformers_openers = tuple(f"{{{{{name}::" for name in transformers_names)
+            self._transformers_pattern_names = transformers_names
+            # The pattern is compiled once and kept until the transformers of the config are modified.
+        return self._transformers_pattern
+
+    @property
+    def watch_ignore_pattern(self) -> Pattern:
+        ignore_globs: Tuple[str, ...] = (*self.watch_ignore_patterns, *(
+            filename for filename in (self.build_manifest_filename, self.tests_results_cache_filename) if filename is not None
+        ))
+        if self._watch_ignore_pattern is None or self._watch_ignore_pattern_globs != ignore_globs:
+            # All the globs are translated and joined in a single regex, so that each event is matched only once.
+            self._watch_ignore_pattern = re.compile('|'.join(f"(?:{fnmatch.translate(glob)})" for glob in ignore_globs) or r'(?!)')
+            self._watch_ignore_pattern_globs = ignore_globs
+        return self._watch_ignore_pattern
+
+    def is_watch_ignored(self, path: str) -> bool:
+        path = path.replace(os.sep, '/')
+        return self.watch_ignore_pattern.match(path) is not None or self.watch_ignore_pattern.match(path.rsplit('/', 1)[-1]) is not None
+
+    def iter_transformers_blocks(self, content: str) -> Iterator[TransformerBlock]:
+        for match in self.transformers_pattern.finditer(content):
+            yield TransformerBlock(name=match[1], attribute=match[2], start=match.start(), end=match.end())
+
+    def find_renderable_end(self, content: str) -> int:
+        # Used when streaming a source, to know up to which offset the content read so far can be rendered without
+        # cutting a transformer block in two. The rest of the content is kept until the next chunk has been read.
+        last_block_end: int = 0
+        for block in self.iter_transformers_blocks(content=content):
+            last_block_end = block.end
+
+        unclosed_opener_match = self._transformers_opener_pattern.search(content, last_block_end)
+        if unclosed_opener_match is not None:
+            # The closing of the block has not been read yet.
+            return unclosed_opener_match.start()
+
+        max_opener_length = max((len(opener) for opener in self._transformers_openers), default=0)
+        for offset in range(max(last_block_end, len(content) - max_opener_length + 1), len(content)):
+            content_end = content[offset:]
+            if any(opener.startswith(content_end) for opener in self._transformers_openers):
+                # The content ends with the beginning of the opener of a block, like '{{fil'.
+                return offset
+        return len(content)
@@ -0,0 +1,79 @@
+import os
+import threading
+from typing import Dict, Optional, NamedTuple
+
+from mdscript.watcher import normalize_path
+
+
+class StoredContent(NamedTuple):
+    content: str
+    mtime_ns: int
+    size: int
+    generation: int
+
+
+class ContentStore:
+    def __init__(self):
+        self.generation = 0
+        self._entries: Dict[str, StoredContent] = dict()
+        self._paths_locks: Dict[str, threading.Lock] = dict()
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.hits = 0
+
+    def start_generation(self):
+        # Called at the beginning of each build. The entries of the previous builds are kept, but they
+        # are checked against the mtime and size of their file once in the new build before being used.
+        with self._lock:
+            self.generation += 1
+
+    def read_text(self, filepath: str) -> str:
+        # The content is kept as str, since the transformers need the whole content of the files they include to
+        # render it. The sources too big to be held in memory are streamed by the Runner, and never stored here.
+        normalized_filepath = normalize_path(filepath)
+        with self._lock:
+            path_lock = self._paths_locks.setdefault(normalized_filepath, threading.Lock())
+        with path_lock:
+            # Only one thread reads a given file, the others rendering the same parts in parallel wait for its content.
+            entry: Optional[StoredContent] = self._get_valid_entry(normalized_filepath=normalized_filepath)
+            if entry is None:
+                entry = self._load(normalized_filepath=normalized_filepath)
+            else:
+                with self._lock:
+                    self.hits += 1
+        return entry.content
+
+    def _get_valid_entry(self, normalized_filepath: str) -> Optional[StoredContent]:
+        with self._lock:
+            entry: Optional[StoredContent] = self._entries.get(normalized_filepath, None)
+        if entry is None:
+            return None
+        if entry.generation == self.generation:
+            # Within a build, the files are only read once, and the Watcher invalidates the ones that are modified.
+            return entry
+
+        file_stat = os.stat(normalized_filepath)
+        if file_stat.st_mtime_ns != entry.mtime_ns or file_stat.st_size != entry.size:
+            self.invalidate(filepath=normalized_filepath)
+            return None
+        with self._lock:
+            entry = self._entries[normalized_filepath] = entry._replace(generation=self.generation)
+        return entry
+
+    def _load(self, normalized_filepath: str) -> StoredContent:
+        with open(normalized_filepath, 'r') as file:
+            file_stat = os.fstat(file.fileno())
+            content = file.read()
+        entry = StoredContent(content=content, mtime_ns=file_stat.st_mtime_ns, size=file_stat.st_size, generation=self.generation)
+        with self._lock:
+            self._entries[normalized_filepath] = entry
+            self.reads += 1
+        return entry
+
+    def invalidate(self, filepath: str):
+        with self._lock:
+            self._entries.pop(normalize_path(filepath), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
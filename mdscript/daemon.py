@@ -0,0 +1,153 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    server: 'DaemonHTTPServer'
+
+    def log_message(self, format: str, *args):
+        logging.debug(f"Daemon request from {self.address_string()} : {format % args}")
+
+    def _send_json(self, status_code: int, data: dict):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json_body(self) -> dict:
+        content_length = int(self.headers.get('Content-Length', 0) or 0)
+        if not content_length > 0:
+            return dict()
+        return json.loads(self.rfile.read(content_length).decode('utf-8'))
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._send_json(200, self.server.daemon.get_status())
+        elif self.path == '/metrics':
+            self._send_json(200, self.server.daemon.get_metrics())
+        else:
+            self._send_json(404, {'error': f"Unknown route {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/build':
+            self._send_json(404, {'error': f"Unknown route {self.path}"})
+            return
+        try:
+            request_data = self._read_json_body()
+        except ValueError as e:
+            self._send_json(400, {'error': f"Invalid json body : {e}"})
+            return
+        if not isinstance(request_data, dict):
+            self._send_json(400, {'error': "The json body must be an object"})
+            return
+        paths: Optional[List[str]] = request_data.get('paths', None)
+        if paths is not None and not (isinstance(paths, list) and all(isinstance(path, str) for path in paths)):
+            self._send_json(400, {'error': "paths must be a list of str"})
+            return
+        self._send_json(200, self.server.daemon.build(paths=paths))
+
+
+class DaemonHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address: Tuple[str, int], daemon: 'MDScriptDaemon'):
+        super().__init__(server_address, DaemonRequestHandler)
+        self.daemon = daemon
+
+
+class MDScriptDaemon:
+    def __init__(self, runner, host: str, port: int):
+        self.runner = runner
+        self.host = host
+        self.port = port
+        self.start_time = time.time()
+        self.builds_count = 0
+        self.last_build: Optional[Dict[str, Any]] = None
+        self._http_server: Optional[DaemonHTTPServer] = None
+
+    def build(self, paths: Optional[List[str]]) -> Dict[str, Any]:
+        output_writer = self.runner.output_writer
+        with self.runner.build_lock:
+            # The Runner, its dependencies graph and its caches stay in memory between the builds,
+            # so a build only costs the rendering of the files that are affected by the paths.
+            start_time = time.perf_counter()
+            writes_count, skipped_writes_count = output_writer.writes_count, output_writer.skipped_writes_count
+            failed_files_count = self.runner.failed_files_count
+
+            if paths is None:
+                self.runner._build_folder(run_tests=False)
+                rendered_filepaths: Optional[List[str]] = None
+            else:
+                rendered_filepaths = self._collect_files_to_render(paths=paths)
+                with self.runner._incremental_build():
+                    for source_filepath in rendered_filepaths:
+                        self.runner._run_in_source_file(source_filepath=source_filepath, run_test=False)
+
+            self.builds_count += 1
+            self.last_build = {
+                'paths': paths, 'rendered': rendered_filepaths,
+                'written': output_writer.writes_count - writes_count,
+                'unchanged': output_writer.skipped_writes_count - skipped_writes_count,
+                'failed': self.runner.failed_files_count - failed_files_count,
+                'duration_ms': (time.perf_counter() - start_time) * 1e3,
+                'finished_at': time.time()
+            }
+            return self.last_build
+
+    def _collect_files_to_render(self, paths: List[str]) -> List[str]:
+        files_to_render: Dict[str, None] = dict()
+        for path in paths:
+            # The paths are translated to the paths the files were registered with in the dependencies
+            # graph, exactly like the watcher does with the paths of the files it receives events for.
+            for registered_filepath in self.runner.watcher.get_event_filepaths(source_filepath=path):
+                for filepath in self.runner.collect_files_to_render(modified_filepath=registered_filepath):
+                    files_to_render[filepath] = None
+        return list(files_to_render.keys())
+
+    def get_status(self) -> Dict[str, Any]:
+        is_building = not self.runner.build_lock.acquire(blocking=False)
+        if is_building is not True:
+            self.runner.build_lock.release()
+        return {
+            'base_dirpath': self.runner.base_dirpath,
+            'building': is_building,
+            'uptime_seconds': time.time() - self.start_time,
+            'builds_count': self.builds_count,
+            'last_build': self.last_build,
+            'dependencies_parents_count': len(self.runner.files_dependencies.parents_to_dependencies)
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        transformers_cache = self.runner.transformers_cache
+        return {
+            'outputs_written': self.runner.output_writer.writes_count,
+            'outputs_unchanged': self.runner.output_writer.skipped_writes_count,
+            'content_store': {'reads': self.runner.content_store.reads, 'hits': self.runner.content_store.hits},
+            'files_failed': self.runner.failed_files_count,
+            'transformers_cache': {
+                'hits': transformers_cache.hits, 'misses': transformers_cache.misses
+            } if transformers_cache is not None else None,
+            'profiling': self.runner.profiler.get_stats() if self.runner.profiler.enabled is True else None
+        }
+
+    def start(self) -> threading.Thread:
+        # Only bound to the host of the config, which is the loopback interface by default, since
+        # anyone able to reach the daemon can trigger builds that write in the base_dirpath.
+        self._http_server = DaemonHTTPServer((self.host, self.port), daemon=self)
+        self.port = self._http_server.server_address[1]
+        server_thread = threading.Thread(target=self._http_server.serve_forever, name='mdscript-daemon', daemon=True)
+        server_thread.start()
+        logging.info(f"mdscript daemon listening on http://{self.host}:{self.port}")
+        return server_thread
+
+    def stop(self):
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+            self._http_server = None
@@ -1,5 +1,7 @@
+import logging
+import threading
 from mdscript.watcher import Watcher
-from typing import Set, Dict
+from typing import Set, Dict, List, Iterable, Tuple
 
 
 class FilesDependenciesManager:
@@ -7,6 +9,8 @@ class FilesDependenciesManager:
         self.watcher = watcher
         self._parents_to_dependencies: Dict[str, Set[str]] = dict()
         self._dependencies_to_parents: Dict[str, Set[str]] = dict()
+        self._lock = threading.RLock()
+        # The files can be rendered in parallel, so the dependencies can be added from multiple threads at once.
 
     @property
     def parents_to_dependencies(self):
@@ -17,6 +21,14 @@ class FilesDependenciesManager:
         return self._dependencies_to_parents
 
     def add_dependency(self, parent_filepath: str, dependency_path: str):
+        with self._lock:
+            self._add_dependency(parent_filepath=parent_filepath, dependency_path=dependency_path)
+        # The watch is added once the lock is released, since the watchdog observer holds its own lock while dispatching
+        # the events to the handler, which takes our lock to find the affected files. Scheduling a watch with our lock
+        # held would take the two locks in the opposite order, and deadlock with the observer thread.
+        self.watcher.add_file_watch(filepath=dependency_path)
+
+    def _add_dependency(self, parent_filepath: str, dependency_path: str):
         if parent_filepath not in self._parents_to_dependencies:
             self._parents_to_dependencies[parent_filepath] = {dependency_path}
         else:
@@ -27,5 +39,69 @@ class FilesDependenciesManager:
         else:
             self._dependencies_to_parents[dependency_path].add(parent_filepath)
 
-        self.watcher.add_file_watch(filepath=dependency_path)
+    def remove_parent_dependencies(self, parent_filepath: str):
+        # Before rendering again a file, we remove its previous dependencies, otherwise a dependency that is
+        # no longer used by the file would keep triggering its render. The dependencies of the dependencies
+        # are kept, since they will not be registered again if the dependency is retrieved from a cache.
+        with self._lock:
+            for dependency_path in self._parents_to_dependencies.pop(parent_filepath, set()):
+                dependency_parents = self._dependencies_to_parents.get(dependency_path, None)
+                if dependency_parents is not None:
+                    dependency_parents.discard(parent_filepath)
+                    if not len(dependency_parents) > 0:
+                        del self._dependencies_to_parents[dependency_path]
+
+    def _walk(self, start_paths: Iterable[str], edges: Dict[str, Set[str]]) -> Set[str]:
+        visited_paths: Set[str] = set()
+        paths_to_visit: List[str] = list(start_paths)
+        while len(paths_to_visit) > 0:
+            current_path = paths_to_visit.pop()
+            for next_path in edges.get(current_path, set()):
+                if next_path not in visited_paths:
+                    # The visited paths are never visited again, which means that a cycle in
+                    # the dependencies cannot make the walk run indefinitely.
+                    visited_paths.add(next_path)
+                    paths_to_visit.append(next_path)
+        return visited_paths
+
+    def get_transitive_dependencies(self, filepaths: Iterable[str]) -> Set[str]:
+        with self._lock:
+            return self._walk(start_paths=filepaths, edges=self._parents_to_dependencies)
+
+    def get_dependencies_edges(self, parent_filepath: str) -> List[Tuple[str, str]]:
+        with self._lock:
+            parents_paths: Set[str] = {parent_filepath, *self._walk(start_paths=[parent_filepath], edges=self._parents_to_dependencies)}
+            return [
+                (current_parent_path, dependency_path)
+                for current_parent_path in parents_paths
+                for dependency_path in self._parents_to_dependencies.get(current_parent_path, set())
+            ]
+
+    def get_affected_parents(self, filepath: str) -> List[str]:
+        with self._lock:
+            affected_paths: Set[str] = self._walk(start_paths=[filepath], edges=self._dependencies_to_parents)
+            affected_paths.discard(filepath)
+
+            # Kahn's algorithm on the sub-graph of the affected files, so that every file comes after all of the
+            # affected files it depends on. The remaining files once no file is without pending dependencies are
+            # part of a cycle, which we report, and still return, so that they will be rendered at least once.
+            pending_dependencies_counts: Dict[str, int] = {
+                affected_path: len(self._parents_to_dependencies.get(affected_path, set()) & affected_paths)
+                for affected_path in affected_paths
+            }
+            ready_paths: List[str] = sorted(path for path, count in pending_dependencies_counts.items() if count == 0)
+            ordered_paths: List[str] = list()
+            while len(ready_paths) > 0:
+                current_path = ready_paths.pop(0)
+                ordered_paths.append(current_path)
+                for parent_path in sorted(self._dependencies_to_parents.get(current_path, set())):
+                    if parent_path in pending_dependencies_counts:
+                        pending_dependencies_counts[parent_path] -= 1
+                        if pending_dependencies_counts[parent_path] == 0:
+                            ready_paths.append(parent_path)
 
+            if len(ordered_paths) < len(affected_paths):
+                cyclic_paths: List[str] = sorted(affected_paths.difference(ordered_paths))
+                logging.warning(f"Circular dependencies found between the files {cyclic_paths}")
+                ordered_paths.extend(cyclic_paths)
+            return ordered_paths
@@ -0,0 +1,134 @@
+import ast
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, NamedTuple
+
+
+BATCH_WRITE_MAX_ITEMS = 25
+
+
+class FixtureTable(NamedTuple):
+    table_name: str
+    region_name: str
+
+
+def find_fixture_table(code: str) -> Optional[FixtureTable]:
+    # The samples are declaring their table with literal keyword arguments, like table_name='movies-table'.
+    # If a sample uses multiple tables, we cannot know in which one its records must be seeded.
+    fixtures_tables = set()
+    for node in ast.walk(ast.parse(code)):
+        if not isinstance(node, ast.Call):
+            continue
+        keywords_values: Dict[str, Any] = {
+            keyword.arg: keyword.value.value for keyword in node.keywords
+            if keyword.arg in ('table_name', 'region_name') and isinstance(keyword.value, ast.Constant)
+        }
+        if 'table_name' in keywords_values and 'region_name' in keywords_values:
+            fixtures_tables.add(FixtureTable(table_name=keywords_values['table_name'], region_name=keywords_values['region_name']))
+    return next(iter(fixtures_tables)) if len(fixtures_tables) == 1 else None
+
+
+def load_fixture_items(records_filepath: str) -> List[dict]:
+    with open(records_filepath, 'r') as records_file:
+        # DynamoDB does not accept floats, so they are loaded as Decimal, like StructNoSQL would have converted them.
+        return json.load(records_file, parse_float=Decimal)
+
+
+def get_item_fingerprint(item: dict) -> str:
+    return json.dumps(item, sort_keys=True, default=str)
+
+
+def batch_write_items(dynamodb_resource: Any, table_name: str, items: List[dict], max_retries: int = 8):
+    for chunk_start in range(0, len(items), BATCH_WRITE_MAX_ITEMS):
+        request_items = {table_name: [
+            {'PutRequest': {'Item': item}} for item in items[chunk_start:chunk_start + BATCH_WRITE_MAX_ITEMS]
+        ]}
+        for retry_index in range(max_retries + 1):
+            response: dict = dynamodb_resource.batch_write_item(RequestItems=request_items)
+            request_items = response.get('UnprocessedItems', None) or {}
+            if not len(request_items) > 0:
+                break
+            # The items throttled by DynamoDB are returned as unprocessed, and must be sent again after a backoff.
+            time.sleep(min(0.05 * (2 ** retry_index), 2))
+        else:
+            raise Exception(f"Could not seed {sum(len(requests) for requests in request_items.values())} items in {table_name}")
+
+
+class SeededTable:
+    def __init__(self, table: Any, pending_fingerprints: Dict[str, int], lock: threading.Lock):
+        self._table = table
+        self._pending_fingerprints = pending_fingerprints
+        self._lock = lock
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._table, name)
+
+    def put_item(self, Item: dict, **kwargs) -> dict:
+        if not len(kwargs) > 0:
+            fingerprint = get_item_fingerprint(Item)
+            with self._lock:
+                if self._pending_fingerprints.get(fingerprint, 0) > 0:
+                    # The sample is putting one of the records we already seeded with a batch write.
+                    self._pending_fingerprints[fingerprint] -= 1
+                    return {}
+        return self._table.put_item(Item=Item, **kwargs)
+
+
+class FixturesSeedingResource:
+    def __init__(self, dynamodb_resource: Any, table_name: str, items: List[dict]):
+        self._dynamodb_resource = dynamodb_resource
+        self.table_name = table_name
+        self._items = items
+        self._pending_fingerprints: Dict[str, int] = dict()
+        self._seeded = False
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._dynamodb_resource, name)
+
+    def Table(self, name: str) -> Any:
+        table = self._dynamodb_resource.Table(name)
+        if name != self.table_name:
+            return table
+        with self._lock:
+            if self._seeded is not True:
+                # The table only exists once the sample created its table client, so the records are seeded
+                # on the first access to the table, which is always before the sample can put or read a record.
+                batch_write_items(dynamodb_resource=self._dynamodb_resource, table_name=name, items=self._items)
+                for item in self._items:
+                    fingerprint = get_item_fingerprint(item)
+                    self._pending_fingerprints[fingerprint] = self._pending_fingerprints.get(fingerprint, 0) + 1
+                self._seeded = True
+        return SeededTable(table=table, pending_fingerprints=self._pending_fingerprints, lock=self._lock)
+
+
+@contextmanager
+def seed_fixtures(code: str, records_filepath: str) -> Iterator[Optional[FixturesSeedingResource]]:
+    from StructNoSQL.clients_middlewares.dynamodb.backend.dynamodb_core import DynamoDbCoreAdapter
+
+    fixture_table: Optional[FixtureTable] = find_fixture_table(code)
+    if fixture_table is None:
+        logging.debug("No single fixture table found in the sample, its records will be put by the sample itself")
+        yield None
+        return
+
+    existing_clients: Dict[str, Any] = DynamoDbCoreAdapter._EXISTING_DATABASE_CLIENTS
+    dynamodb_resource = existing_clients.get(fixture_table.region_name, None) or existing_clients.get('default', None)
+    if dynamodb_resource is None:
+        import boto3
+        dynamodb_resource = boto3.resource('dynamodb', region_name=fixture_table.region_name)
+
+    seeding_resource = FixturesSeedingResource(
+        dynamodb_resource=dynamodb_resource, table_name=fixture_table.table_name,
+        items=load_fixture_items(records_filepath=records_filepath)
+    )
+    existing_clients[fixture_table.region_name] = seeding_resource
+    try:
+        yield seeding_resource
+    finally:
+        existing_clients[fixture_table.region_name] = dynamodb_resource
+        # The unwrapped resource is kept, so that the next samples can reuse its connections.
@@ -0,0 +1,61 @@
+import logging
+import os
+import subprocess
+from typing import List, Optional, NamedTuple, Set
+
+from mdscript.watcher import normalize_path
+
+
+class GitState(NamedTuple):
+    commit: str
+    dirty_paths: List[str]
+    # The paths that differed from the commit when the state was captured, like uncommitted modifications.
+
+
+def run_git(repository_dirpath: str, args: List[str]) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', '-C', repository_dirpath, *args], capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        # Not in a git repository, git is not installed, or the commit is unknown, like in a shallow clone.
+        return None
+
+
+def get_repository_root(dirpath: str) -> Optional[str]:
+    repository_root: Optional[str] = run_git(dirpath, ['rev-parse', '--show-toplevel'])
+    return normalize_path(repository_root.strip()) if repository_root is not None else None
+
+
+def get_changed_paths(repository_root: str, commit: str) -> Optional[Set[str]]:
+    # The diff is made between the commit and the working tree, so that the staged and uncommitted modifications
+    # are included, and the untracked files are added since a new file can be a dependency that has been created.
+    modified_paths: Optional[str] = run_git(repository_root, ['diff', '--name-only', '-z', commit, '--'])
+    untracked_paths: Optional[str] = run_git(repository_root, ['ls-files', '--others', '--exclude-standard', '-z'])
+    if modified_paths is None or untracked_paths is None:
+        return None
+    return {
+        normalize_path(os.path.join(repository_root, relative_path))
+        for relative_path in (*modified_paths.split('\0'), *untracked_paths.split('\0')) if len(relative_path) > 0
+    }
+
+
+def capture_git_state(repository_root: str) -> Optional[GitState]:
+    head_commit: Optional[str] = run_git(repository_root, ['rev-parse', 'HEAD'])
+    if head_commit is None:
+        return None
+    head_commit = head_commit.strip()
+    dirty_paths: Optional[Set[str]] = get_changed_paths(repository_root=repository_root, commit=head_commit)
+    if dirty_paths is None:
+        return None
+    return GitState(commit=head_commit, dirty_paths=sorted(dirty_paths))
+
+
+def get_changed_paths_since(repository_root: str, git_state: GitState) -> Optional[Set[str]]:
+    changed_paths: Optional[Set[str]] = get_changed_paths(repository_root=repository_root, commit=git_state.commit)
+    if changed_paths is None:
+        logging.info(f"Could not diff the working tree against {git_state.commit}, every file will be checked")
+        return None
+    # A file that was modified when the state was captured and has since been reverted does not appear in the
+    # diff anymore, but the outputs were rendered with its modified content, so it is still a changed file.
+    return changed_paths | set(git_state.dirty_paths)
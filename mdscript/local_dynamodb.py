@@ -0,0 +1,403 @@
+import copy
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+PathElement = Union[str, int]
+_PATH_ELEMENTS_PATTERN = re.compile(r'\s*(?:\.?\s*(#?[A-Za-z0-9_\-]+)|\[\s*(\d+)\s*\])')
+_UPDATE_CLAUSES_PATTERN = re.compile(r'\b(SET|REMOVE|ADD|DELETE)\b', flags=re.IGNORECASE)
+
+
+class ResourceInUseException(Exception):
+    # The StructNoSQL adapter compares the class name of the exception raised by the
+    # create_table function to know if the table already existed, so the name matters.
+    pass
+
+
+class ResourceNotFoundException(Exception):
+    pass
+
+
+def _raise_validation_exception(message: str, operation_name: str):
+    from botocore.exceptions import ClientError
+    # StructNoSQL initializes the missing parents of a field when receiving a ValidationException
+    # from an update request, so we need to raise the same exception as boto3 would have.
+    raise ClientError({'Error': {'Code': 'ValidationException', 'Message': message}}, operation_name)
+
+
+def _to_dynamodb_value(value: Any) -> Any:
+    from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+    # The values go through the same serialization as with a boto3 resource, so that the floats are refused,
+    # and that the numbers are retrieved as Decimal, exactly like they would have been from a real table.
+    return TypeDeserializer().deserialize(TypeSerializer().serialize(value))
+
+
+def _split_top_level(expression: str, separator: str = ',') -> List[str]:
+    parts: List[str] = list()
+    depth, last_index = 0, 0
+    for i, character in enumerate(expression):
+        if character in '([':
+            depth += 1
+        elif character in ')]':
+            depth -= 1
+        elif character == separator and depth == 0:
+            parts.append(expression[last_index:i].strip())
+            last_index = i + 1
+    parts.append(expression[last_index:].strip())
+    return [part for part in parts if len(part) > 0]
+
+
+def _parse_path(path_expression: str, attribute_names: Dict[str, str]) -> List[PathElement]:
+    path_elements: List[PathElement] = list()
+    position = 0
+    path_expression = path_expression.strip()
+    while position < len(path_expression):
+        match = _PATH_ELEMENTS_PATTERN.match(path_expression, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Invalid document path {path_expression}")
+        if match[1] is not None:
+            name: str = match[1]
+            path_elements.append(attribute_names[name] if name.startswith('#') else name)
+        else:
+            path_elements.append(int(match[2]))
+        position = match.end()
+    return path_elements
+
+
+_MISSING = object()
+
+
+def _get_in_path(data: Any, path_elements: List[PathElement]) -> Any:
+    current = data
+    for path_element in path_elements:
+        if isinstance(path_element, int):
+            if not isinstance(current, list) or not path_element < len(current):
+                return _MISSING
+            current = current[path_element]
+        else:
+            if not isinstance(current, dict) or path_element not in current:
+                return _MISSING
+            current = current[path_element]
+    return current
+
+
+def _set_in_projection(projected: dict, path_elements: List[PathElement], value: Any):
+    current: Any = projected
+    for i, path_element in enumerate(path_elements):
+        is_last = i + 1 == len(path_elements)
+        next_container = None if is_last else ([] if isinstance(path_elements[i + 1], int) else {})
+        if isinstance(current, list):
+            # List indexes in projections are compacted, like DynamoDB returns them.
+            current.append(value if is_last else next_container)
+            current = current[-1]
+        else:
+            if is_last:
+                current[path_element] = value
+            else:
+                current = current.setdefault(path_element, next_container)
+
+
+def _project(item: dict, paths: List[List[PathElement]]) -> dict:
+    projected: dict = dict()
+    for path_elements in paths:
+        value = _get_in_path(item, path_elements)
+        if value is not _MISSING:
+            _set_in_projection(projected, path_elements, copy.deepcopy(value))
+    return projected
+
+
+class LocalDynamoDBTable:
+    def __init__(self, name: str, key_schema: List[dict], global_secondary_indexes: Optional[List[dict]]):
+        self.name = name
+        self.hash_key_name, self.sort_key_name = self._read_key_schema(key_schema)
+        self.indexes: Dict[str, dict] = {
+            index_data['IndexName']: index_data for index_data in (global_secondary_indexes or list())
+        }
+        self._items: Dict[Tuple[Any, Any], dict] = dict()
+        # The items are stored in a dict keyed by their primary key, which keeps their insertion order.
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _read_key_schema(key_schema: List[dict]) -> Tuple[str, Optional[str]]:
+        hash_key_name, sort_key_name = None, None
+        for key_data in key_schema:
+            if key_data['KeyType'] == 'HASH':
+                hash_key_name = key_data['AttributeName']
+            elif key_data['KeyType'] == 'RANGE':
+                sort_key_name = key_data['AttributeName']
+        return hash_key_name, sort_key_name
+
+    def _get_primary_key(self, key_data: dict, operation_name: str) -> Tuple[Any, Any]:
+        if self.hash_key_name not in key_data or (self.sort_key_name is not None and self.sort_key_name not in key_data):
+            _raise_validation_exception("The provided key element does not match the schema", operation_name)
+        return key_data[self.hash_key_name], key_data.get(self.sort_key_name, None) if self.sort_key_name is not None else None
+
+    def _make_key_dict(self, item: dict, index_name: Optional[str] = None) -> dict:
+        keys_names: List[str] = [self.hash_key_name]
+        if self.sort_key_name is not None:
+            keys_names.append(self.sort_key_name)
+        if index_name is not None:
+            keys_names.extend(key_data['AttributeName'] for key_data in self.indexes[index_name]['KeySchema'])
+        return {key_name: item[key_name] for key_name in keys_names if key_name in item}
+
+    @staticmethod
+    def _parse_projection(kwargs: dict) -> Optional[List[List[PathElement]]]:
+        projection_expression: Optional[str] = kwargs.get('ProjectionExpression', None)
+        if projection_expression is None:
+            return None
+        attribute_names: Dict[str, str] = kwargs.get('ExpressionAttributeNames', dict())
+        return [_parse_path(path, attribute_names) for path in _split_top_level(projection_expression)]
+
+    def put_item(self, Item: dict, **kwargs) -> dict:
+        with self._lock:
+            primary_key = self._get_primary_key(Item, 'PutItem')
+            old_item: Optional[dict] = self._items.get(primary_key, None)
+            self._items[primary_key] = _to_dynamodb_value(Item)
+            if kwargs.get('ReturnValues', 'NONE') == 'ALL_OLD' and old_item is not None:
+                return {'Attributes': old_item}
+            return {}
+
+    def get_item(self, Key: dict, **kwargs) -> dict:
+        with self._lock:
+            item: Optional[dict] = self._items.get(self._get_primary_key(Key, 'GetItem'), None)
+            if item is None:
+                return {}
+            projection_paths = self._parse_projection(kwargs)
+            return {'Item': copy.deepcopy(item) if projection_paths is None else _project(item, projection_paths)}
+
+    def delete_item(self, Key: dict, **kwargs) -> dict:
+        with self._lock:
+            old_item: Optional[dict] = self._items.pop(self._get_primary_key(Key, 'DeleteItem'), None)
+            if kwargs.get('ReturnValues', 'NONE') == 'ALL_OLD' and old_item is not None:
+                return {'Attributes': old_item}
+            return {}
+
+    def _evaluate_value(self, expression: str, item: dict, attribute_names: Dict[str, str], attribute_values: Dict[str, Any]) -> Any:
+        expression = expression.strip()
+        if expression.startswith(':'):
+            return _to_dynamodb_value(attribute_values[expression])
+
+        function_match = re.match(r'^(if_not_exists|list_append)\s*\((.*)\)$', expression, flags=re.DOTALL)
+        if function_match is not None:
+            arguments: List[str] = _split_top_level(function_match[2])
+            if function_match[1] == 'if_not_exists':
+                existing_value = _get_in_path(item, _parse_path(arguments[0], attribute_names))
+                if existing_value is not _MISSING:
+                    return copy.deepcopy(existing_value)
+                return self._evaluate_value(arguments[1], item, attribute_names, attribute_values)
+            else:
+                return [
+                    *self._evaluate_value(arguments[0], item, attribute_names, attribute_values),
+                    *self._evaluate_value(arguments[1], item, attribute_names, attribute_values)
+                ]
+
+        value = _get_in_path(item, _parse_path(expression, attribute_names))
+        if value is _MISSING:
+            _raise_validation_exception("The provided expression refers to an attribute that does not exist in the item", 'UpdateItem')
+        return copy.deepcopy(value)
+
+    @staticmethod
+    def _get_parent_container(item: dict, path_elements: List[PathElement]) -> Any:
+        parent = _get_in_path(item, path_elements[:-1]) if len(path_elements) > 1 else item
+        last_element = path_elements[-1]
+        if parent is _MISSING or (isinstance(last_element, int) and not isinstance(parent, list)) or \
+                (isinstance(last_element, str) and not isinstance(parent, dict)):
+            _raise_validation_exception("The document path provided in the update expression is invalid for update", 'UpdateItem')
+        return parent
+
+    def update_item(self, Key: dict, UpdateExpression: str, **kwargs) -> dict:
+        attribute_names: Dict[str, str] = kwargs.get('ExpressionAttributeNames', dict())
+        attribute_values: Dict[str, Any] = kwargs.get('ExpressionAttributeValues', dict())
+        return_values: str = kwargs.get('ReturnValues', 'NONE')
+
+        with self._lock:
+            primary_key = self._get_primary_key(Key, 'UpdateItem')
+            old_item: Optional[dict] = self._items.get(primary_key, None)
+            new_item: dict = copy.deepcopy(old_item) if old_item is not None else _to_dynamodb_value(Key)
+
+            set_actions: List[Tuple[List[PathElement], Any]] = list()
+            remove_paths: List[List[PathElement]] = list()
+            clauses: List[str] = _UPDATE_CLAUSES_PATTERN.split(UpdateExpression)
+            for clause_keyword, clause_body in zip(clauses[1::2], clauses[2::2]):
+                clause_keyword = clause_keyword.upper()
+                if clause_keyword not in ('SET', 'REMOVE'):
+                    raise NotImplementedError(f"The {clause_keyword} update clause is not supported by the local DynamoDB backend")
+                for action in _split_top_level(clause_body):
+                    if clause_keyword == 'SET':
+                        path_expression, value_expression = action.split('=', 1)
+                        # All the values are evaluated on the item before the update, like DynamoDB does.
+                        set_actions.append((
+                            _parse_path(path_expression, attribute_names),
+                            self._evaluate_value(value_expression, old_item or dict(), attribute_names, attribute_values)
+                        ))
+                    else:
+                        remove_paths.append(_parse_path(action, attribute_names))
+
+            for path_elements, value in set_actions:
+                parent = self._get_parent_container(new_item, path_elements)
+                last_element = path_elements[-1]
+                if isinstance(last_element, int) and not last_element < len(parent):
+                    parent.append(value)
+                else:
+                    parent[last_element] = value
+
+            # The list elements are removed from the highest to the lowest index, so
+            # that removing an element does not shift the indexes of the next ones.
+            for path_elements in sorted(remove_paths, key=lambda elements: [
+                (0, element) if isinstance(element, str) else (1, -element) for element in elements
+            ]):
+                parent = self._get_parent_container(new_item, path_elements)
+                last_element = path_elements[-1]
+                if isinstance(last_element, int):
+                    if last_element < len(parent):
+                        del parent[last_element]
+                else:
+                    parent.pop(last_element, None)
+
+            self._items[primary_key] = new_item
+
+            updated_paths: List[List[PathElement]] = [path_elements for path_elements, value in set_actions] + remove_paths
+            if return_values == 'ALL_OLD':
+                return {'Attributes': copy.deepcopy(old_item)} if old_item is not None else {}
+            elif return_values == 'ALL_NEW':
+                return {'Attributes': copy.deepcopy(new_item)}
+            elif return_values == 'UPDATED_OLD':
+                attributes = _project(old_item or dict(), updated_paths)
+                return {'Attributes': attributes} if len(attributes) > 0 else {}
+            elif return_values == 'UPDATED_NEW':
+                attributes = _project(new_item, updated_paths)
+                return {'Attributes': attributes} if len(attributes) > 0 else {}
+            return {}
+
+    def _evaluate_condition(self, condition: Any, item: dict) -> bool:
+        # Evaluates the conditions objects from boto3.dynamodb.conditions, with their get_expression function.
+        expression: dict = condition.get_expression()
+        operator: str = expression['operator']
+        values: tuple = expression['values']
+        if operator == 'AND':
+            return self._evaluate_condition(values[0], item) and self._evaluate_condition(values[1], item)
+        elif operator == 'OR':
+            return self._evaluate_condition(values[0], item) or self._evaluate_condition(values[1], item)
+        elif operator == 'NOT':
+            return not self._evaluate_condition(values[0], item)
+
+        value = _get_in_path(item, _parse_path(values[0].name, dict()))
+        if operator == 'attribute_exists':
+            return value is not _MISSING
+        elif operator == 'attribute_not_exists':
+            return value is _MISSING
+        elif value is _MISSING:
+            return False
+        elif operator == '=':
+            return value == values[1]
+        elif operator == '<>':
+            return value != values[1]
+        elif operator == '<':
+            return value < values[1]
+        elif operator == '<=':
+            return value <= values[1]
+        elif operator == '>':
+            return value > values[1]
+        elif operator == '>=':
+            return value >= values[1]
+        elif operator == 'BETWEEN':
+            return values[1] <= value <= values[2]
+        elif operator == 'IN':
+            return value in values[1:]
+        elif operator == 'begins_with':
+            return isinstance(value, str) and value.startswith(values[1])
+        elif operator == 'contains':
+            return values[1] in value
+        raise NotImplementedError(f"The {operator} condition is not supported by the local DynamoDB backend")
+
+    def query(self, KeyConditionExpression: Any, **kwargs) -> dict:
+        index_name: Optional[str] = kwargs.get('IndexName', None)
+        limit: Optional[int] = kwargs.get('Limit', None)
+        exclusive_start_key: Optional[dict] = kwargs.get('ExclusiveStartKey', None)
+        filter_expression: Optional[Any] = kwargs.get('FilterExpression', None)
+        projection_paths = self._parse_projection(kwargs)
+
+        with self._lock:
+            index_projection: dict = self.indexes[index_name]['Projection'] if index_name is not None else {'ProjectionType': 'ALL'}
+            candidates_items: List[dict] = [item for item in self._items.values() if self._evaluate_condition(KeyConditionExpression, item)]
+
+            if exclusive_start_key is not None:
+                start_primary_key = self._get_primary_key(exclusive_start_key, 'Query')
+                for i, item in enumerate(candidates_items):
+                    if self._get_primary_key(item, 'Query') == start_primary_key:
+                        candidates_items = candidates_items[i + 1:]
+                        break
+
+            evaluated_items: List[dict] = candidates_items[:limit] if limit is not None else candidates_items
+            output_items: List[dict] = list()
+            for item in evaluated_items:
+                if filter_expression is not None and not self._evaluate_condition(filter_expression, item):
+                    continue
+                if index_projection['ProjectionType'] == 'KEYS_ONLY':
+                    item = self._make_key_dict(item, index_name)
+                elif index_projection['ProjectionType'] == 'INCLUDE':
+                    item = {**self._make_key_dict(item, index_name), **{
+                        attribute_name: item[attribute_name] for attribute_name
+                        in index_projection.get('NonKeyAttributes', list()) if attribute_name in item
+                    }}
+                output_items.append(copy.deepcopy(item) if projection_paths is None else _project(item, projection_paths))
+
+            response: dict = {'Items': output_items, 'Count': len(output_items), 'ScannedCount': len(evaluated_items)}
+            if limit is not None and len(evaluated_items) == limit and len(evaluated_items) > 0:
+                # Like DynamoDB, a query that stops right at its last item still returns a LastEvaluatedKey,
+                # and only the next query, which will not find any item, will be considered as the end.
+                response['LastEvaluatedKey'] = self._make_key_dict(evaluated_items[-1], index_name)
+            return response
+
+
+class LocalDynamoDBResource:
+    def __init__(self):
+        self._tables: Dict[str, LocalDynamoDBTable] = dict()
+        self._lock = threading.Lock()
+
+    def create_table(self, TableName: str, KeySchema: List[dict], **kwargs) -> LocalDynamoDBTable:
+        with self._lock:
+            if TableName in self._tables:
+                raise ResourceInUseException(f"Table already exists: {TableName}")
+            table = LocalDynamoDBTable(
+                name=TableName, key_schema=KeySchema,
+                global_secondary_indexes=kwargs.get('GlobalSecondaryIndexes', None)
+            )
+            self._tables[TableName] = table
+            return table
+
+    def Table(self, name: str) -> LocalDynamoDBTable:
+        table: Optional[LocalDynamoDBTable] = self._tables.get(name, None)
+        if table is None:
+            raise ResourceNotFoundException(f"Requested resource not found: Table: {name} not found")
+        return table
+
+    def batch_write_item(self, RequestItems: Dict[str, List[dict]], **kwargs) -> dict:
+        if sum(len(requests) for requests in RequestItems.values()) > 25:
+            _raise_validation_exception("Too many items requested for the BatchWriteItem call", 'BatchWriteItem')
+        for table_name, requests in RequestItems.items():
+            table = self.Table(table_name)
+            for request in requests:
+                if 'PutRequest' in request:
+                    table.put_item(Item=request['PutRequest']['Item'])
+                elif 'DeleteRequest' in request:
+                    table.delete_item(Key=request['DeleteRequest']['Key'])
+        return {'UnprocessedItems': {}}
+
+    def reset(self):
+        with self._lock:
+            # The tables are dropped rather than emptied, since the next sample might
+            # declare a table with the same name but with different indexes.
+            self._tables.clear()
+
+
+def install_local_dynamodb() -> LocalDynamoDBResource:
+    from StructNoSQL.clients_middlewares.dynamodb.backend.dynamodb_core import DynamoDbCoreAdapter
+    # The StructNoSQL adapter keeps its boto3 resources in a static dict keyed by region, and use the 'default' one
+    # for any region it does not have a resource for. Replacing all of them by our local resource means that all
+    # the tables created afterwards will use the local backend, without a single request being sent to AWS.
+    local_resource = LocalDynamoDBResource()
+    DynamoDbCoreAdapter._EXISTING_DATABASE_CLIENTS.clear()
+    DynamoDbCoreAdapter._EXISTING_DATABASE_CLIENTS['default'] = local_resource
+    return local_resource
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional, NamedTuple, Iterator
+
+
+class WrittenOutput(NamedTuple):
+    content_hash: str
+    mtime_ns: int
+    size: int
+
+
+HASH_READ_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_content(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def hash_text_file(filepath: str) -> str:
+    # Read by chunks, so that hashing a large output does not load it entirely in memory.
+    content_hash = hashlib.sha1()
+    with open(filepath, 'r') as file:
+        for chunk in iter(lambda: file.read(HASH_READ_CHUNK_SIZE), ''):
+            content_hash.update(chunk.encode('utf-8'))
+    return content_hash.hexdigest()
+
+
+class OutputStream:
+    def __init__(self, output_filepath: str, temporary_filepath: str):
+        self.output_filepath = output_filepath
+        self.temporary_filepath = temporary_filepath
+        self._file = open(temporary_filepath, 'x')
+        self._content_hash = hashlib.sha1()
+        self.bytes_written = 0
+        self.written: Optional[bool] = None
+        # Set once the stream has been committed, to False if the output was left untouched since it did not change.
+
+    def write(self, content: str):
+        encoded_content = content.encode('utf-8')
+        self._file.write(content)
+        self._content_hash.update(encoded_content)
+        self.bytes_written += len(encoded_content)
+
+    def close(self) -> str:
+        self._file.close()
+        return self._content_hash.hexdigest()
+
+
+class OutputWriter:
+    def __init__(self):
+        self._written_outputs: Dict[str, WrittenOutput] = dict()
+        # Keyed by the absolute paths, since the watcher events do not use the same paths as the Runner.
+        self._lock = threading.Lock()
+        self.writes_count = 0
+        self.skipped_writes_count = 0
+
+    def _get_untouched_written_output(self, output_filepath: str, output_stat: os.stat_result) -> Optional[WrittenOutput]:
+        with self._lock:
+            written_output: Optional[WrittenOutput] = self._written_outputs.get(os.path.abspath(output_filepath), None)
+        if written_output is not None and written_output.mtime_ns == output_stat.st_mtime_ns and written_output.size == output_stat.st_size:
+            return written_output
+        return None
+
+    def _get_existing_content_hash(self, output_filepath: str) -> Optional[str]:
+        try:
+            output_stat = os.stat(output_filepath)
+        except OSError:
+            return None
+
+        written_output: Optional[WrittenOutput] = self._get_untouched_written_output(output_filepath, output_stat)
+        if written_output is not None:
+            # The file has not been touched since we wrote it, so we can trust the hash of the previous render.
+            return written_output.content_hash
+
+        return hash_text_file(output_filepath)
+
+    def is_own_write(self, output_filepath: str) -> bool:
+        # True if the file is still exactly the one we wrote, so that the events caused by our own writes can be ignored.
+        try:
+            output_stat = os.stat(output_filepath)
+        except OSError:
+            return False
+        return self._get_untouched_written_output(output_filepath, output_stat) is not None
+
+    def has_content_hash(self, output_filepath: str, content_hash: str) -> bool:
+        return self._get_existing_content_hash(output_filepath=output_filepath) == content_hash
+
+    def write(self, output_filepath: str, content: str) -> bool:
+        content_hash = hash_content(content)
+        if self._get_existing_content_hash(output_filepath=output_filepath) == content_hash:
+            # Writing an identical file would still update its mtime, and make the
+            # Docusaurus dev server reload the page, so we do not write anything.
+            with self._lock:
+                self.skipped_writes_count += 1
+            return False
+
+        temporary_filepath = self._make_temporary_filepath(output_filepath)
+        try:
+            with open(temporary_filepath, 'x') as temporary_file:
+                temporary_file.write(content)
+            self._record_written_output(output_filepath=output_filepath, content_hash=content_hash, temporary_filepath=temporary_filepath)
+            os.replace(temporary_filepath, output_filepath)
+            # The content is written to a temporary file then renamed, so that a reader
+            # of the output file will never see a partially written file.
+        except BaseException:
+            if os.path.exists(temporary_filepath):
+                os.remove(temporary_filepath)
+            raise
+        return True
+
+    def _record_written_output(self, output_filepath: str, content_hash: str, temporary_filepath: str):
+        output_stat = os.stat(temporary_filepath)
+        # Recorded before the temporary file is renamed, which keeps its mtime and size, so that the watcher
+        # already knows the output is our own write when it receives the event of the rename.
+        with self._lock:
+            self._written_outputs[os.path.abspath(output_filepath)] = WrittenOutput(
+                content_hash=content_hash, mtime_ns=output_stat.st_mtime_ns, size=output_stat.st_size
+            )
+            self.writes_count += 1
+
+    def get_written_output(self, output_filepath: str) -> Optional[WrittenOutput]:
+        with self._lock:
+            return self._written_outputs.get(os.path.abspath(output_filepath), None)
+
+    def add_process_write(self, output_filepath: str, written_output: Optional[WrittenOutput]):
+        # Records the write of an output by a render process, or that the process skipped it, as if we wrote it.
+        with self._lock:
+            if written_output is None:
+                self.skipped_writes_count += 1
+                return
+            self._written_outputs[os.path.abspath(output_filepath)] = written_output
+            self.writes_count += 1
+
+    @staticmethod
+    def _make_temporary_filepath(output_filepath: str) -> str:
+        output_dirpath, output_filename = os.path.split(output_filepath)
+        return os.path.join(output_dirpath, f".{output_filename}.{uuid.uuid4().hex}.tmp")
+
+    @contextmanager
+    def open_stream(self, output_filepath: str) -> Iterator[OutputStream]:
+        # The content is written to the temporary file as soon as it is rendered, and the output file is
+        # only replaced at the end, if the content changed, exactly like with the write function.
+        output_stream = OutputStream(output_filepath=output_filepath, temporary_filepath=self._make_temporary_filepath(output_filepath))
+        try:
+            yield output_stream
+            content_hash = output_stream.close()
+            if self._get_existing_content_hash(output_filepath=output_filepath) == content_hash:
+                os.remove(output_stream.temporary_filepath)
+                with self._lock:
+                    self.skipped_writes_count += 1
+                output_stream.written = False
+                return
+            self._record_written_output(
+                output_filepath=output_filepath, content_hash=content_hash, temporary_filepath=output_stream.temporary_filepath
+            )
+            os.replace(output_stream.temporary_filepath, output_filepath)
+        except BaseException:
+            output_stream.close()
+            if os.path.exists(output_stream.temporary_filepath):
+                os.remove(output_stream.temporary_filepath)
+            raise
+        output_stream.written = True
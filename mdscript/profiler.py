@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Iterator, ContextManager
+
+
+class SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, duration_seconds: float):
+        self.count += 1
+        self.total_seconds += duration_seconds
+        self.max_seconds = max(self.max_seconds, duration_seconds)
+
+
+class BuildProfiler:
+    CATEGORY_FILE = 'file'
+    CATEGORY_TRANSFORMER = 'transformer'
+    CATEGORY_TEST = 'test'
+    CATEGORY_WATCHER = 'watcher'
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._start_time = time.perf_counter()
+        self._trace_events: List[dict] = list()
+        self._spans_stats: Dict[str, Dict[str, SpanStats]] = dict()
+        self._counters: Dict[str, int] = dict()
+        self._lock = threading.Lock()
+
+    def span(self, category: str, name: str, **args) -> ContextManager[dict]:
+        if self.enabled is not True:
+            return nullcontext(dict())
+        return self._span(category=category, name=name, args=args)
+
+    @contextmanager
+    def _span(self, category: str, name: str, args: dict) -> Iterator[dict]:
+        # The args dict is yielded, so that the values only known at the end of the span can be added to it.
+        start_time = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add_span(category=category, name=name, start_time=start_time, end_time=time.perf_counter(), args=args)
+
+    def add_span(self, category: str, name: str, start_time: float, end_time: float, args: Optional[dict] = None):
+        if self.enabled is not True:
+            return
+        duration_seconds = end_time - start_time
+        with self._lock:
+            self._trace_events.append({
+                'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                'ts': (start_time - self._start_time) * 1e6, 'dur': duration_seconds * 1e6, 'args': args or dict()
+            })
+            # The events are in the Chrome trace-event format, which can be opened in chrome://tracing or Perfetto.
+            category_stats = self._spans_stats.setdefault(category, dict())
+            category_stats.setdefault(name, SpanStats()).add(duration_seconds)
+
+    def increment(self, counter_name: str, value: int = 1):
+        if self.enabled is not True:
+            return
+        with self._lock:
+            self._counters[counter_name] = self._counters.get(counter_name, 0) + value
+
+    def get_stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                'spans': {
+                    category: {
+                        name: {'count': stats.count, 'total_ms': stats.total_seconds * 1e3, 'max_ms': stats.max_seconds * 1e3}
+                        for name, stats in category_stats.items()
+                    } for category, category_stats in self._spans_stats.items()
+                },
+                'counters': dict(self._counters)
+            }
+
+    def export_chrome_trace(self, trace_filepath: str):
+        with self._lock:
+            trace_events = list(self._trace_events)
+        with open(trace_filepath, 'w+') as trace_file:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, trace_file)
+
+    def format_summary(self, counters: Optional[Dict[str, int]] = None, max_rows: int = 10) -> str:
+        with self._lock:
+            spans_stats = {category: dict(stats) for category, stats in self._spans_stats.items()}
+            all_counters = {**self._counters, **(counters or dict())}
+
+        summary_lines: List[str] = list()
+        for category, title in (
+                (self.CATEGORY_TRANSFORMER, 'Transformers'), (self.CATEGORY_TEST, 'Tests'),
+                (self.CATEGORY_FILE, 'Slowest files'), (self.CATEGORY_WATCHER, 'Watcher event to render latency')
+        ):
+            category_stats: Dict[str, SpanStats] = spans_stats.get(category, dict())
+            if not len(category_stats) > 0:
+                continue
+            summary_lines.append(f"{title} :")
+            summary_lines.append(f"  {'name':<60} {'count':>7} {'total ms':>10} {'avg ms':>9} {'max ms':>9}")
+            sorted_stats = sorted(category_stats.items(), key=lambda item: item[1].total_seconds, reverse=True)
+            for name, stats in sorted_stats[:max_rows]:
+                summary_lines.append(
+                    f"  {name[-60:]:<60} {stats.count:>7} {stats.total_seconds * 1e3:>10.1f} "
+                    f"{stats.total_seconds / stats.count * 1e3:>9.2f} {stats.max_seconds * 1e3:>9.2f}"
+                )
+            if len(sorted_stats) > max_rows:
+                summary_lines.append(f"  ... and {len(sorted_stats) - max_rows} more")
+
+        if len(all_counters) > 0:
+            summary_lines.append("Counters :")
+            for counter_name, value in sorted(all_counters.items()):
+                summary_lines.append(f"  {counter_name:<60} {value:>7}")
+        return '\n'.join(summary_lines)
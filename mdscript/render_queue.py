@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from mdscript.profiler import BuildProfiler
+
+
+class DebouncedRenderQueue:
+    THREAD_NAME = 'mdscript-render-queue'
+
+    def __init__(self, runner, debounce_seconds: float, max_delay_seconds: float):
+        self.runner = runner
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._pending_filepaths: Dict[str, float] = dict()
+        # The files are rendered in the order they have been modified, and each one is mapped
+        # to the time of its first event, to measure the latency between the event and the render.
+        self._first_push_time: Optional[float] = None
+        self._last_push_time: Optional[float] = None
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        with self._condition:
+            if self._running is True:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._worker_loop, name=self.THREAD_NAME, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def push(self, filepaths: Iterable[str]):
+        with self._condition:
+            now = time.monotonic()
+            event_time = time.perf_counter()
+            for filepath in filepaths:
+                self._pending_filepaths.setdefault(filepath, event_time)
+            if self._first_push_time is None:
+                self._first_push_time = now
+            self._last_push_time = now
+            self._condition.notify_all()
+
+    def _wait_for_burst_end(self) -> List[Tuple[str, float]]:
+        with self._condition:
+            while self._running is True and not len(self._pending_filepaths) > 0:
+                self._condition.wait()
+
+            while self._running is True:
+                # Editors emit multiple events for a single save, so we wait until no new event has been received
+                # during the debounce window. The max delay ensures the latency stays bounded if events never stop.
+                deadline = min(
+                    self._last_push_time + self.debounce_seconds,
+                    self._first_push_time + self.max_delay_seconds
+                )
+                remaining_seconds = deadline - time.monotonic()
+                if remaining_seconds <= 0:
+                    break
+                self._condition.wait(timeout=remaining_seconds)
+
+            filepaths = list(self._pending_filepaths.items())
+            self._pending_filepaths.clear()
+            self._first_push_time = None
+            self._last_push_time = None
+            return filepaths
+
+    def _worker_loop(self):
+        while self._running is True:
+            filepaths = self._wait_for_burst_end()
+            if self._running is not True:
+                break
+            self._process_burst(filepaths=filepaths)
+
+    def _process_burst(self, filepaths: List[Tuple[str, float]]):
+        # The files of a burst are rendered as a single build, which saves the manifest once all of them are rendered.
+        with self.runner._incremental_build():
+            self._process_filepaths(filepaths=filepaths)
+
+    def _process_filepaths(self, filepaths: List[Tuple[str, float]]):
+        for filepath, event_time in filepaths:
+            try:
+                self._process_filepath(filepath=filepath)
+            except Exception as e:
+                logging.warning(e)
+            self.runner.profiler.add_span(
+                category=BuildProfiler.CATEGORY_WATCHER, name=filepath,
+                start_time=event_time, end_time=time.perf_counter()
+            )
+
+    def _process_filepath(self, filepath: str):
+        self.runner._run_in_source_file(source_filepath=filepath, run_test=False)
+
+
+class DebouncedTestsQueue(DebouncedRenderQueue):
+    THREAD_NAME = 'mdscript-tests-queue'
+
+    # Runs the tests of the modified files in its own thread, so that a slow sample never delays the
+    # render of the files modified after it. The files are pushed at the same time as to the render queue.
+    def _process_burst(self, filepaths: List[Tuple[str, float]]):
+        # The tests run outside of the build lock, and run_file_tests saves their results itself.
+        self._process_filepaths(filepaths=filepaths)
+
+    def _process_filepath(self, filepath: str):
+        self.runner.run_file_tests(source_filepath=filepath)
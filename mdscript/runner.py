@@ -1,11 +1,41 @@
+import copy
+import functools
+import hashlib
 import logging
 import os
-import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, Optional, List, NamedTuple, Set, Tuple, Callable, Iterator, TextIO, TYPE_CHECKING
 
+from mdscript.build_manifest import BuildManifest
+from mdscript.compiled_templates import CompiledTemplatesCache
+from mdscript.content_store import ContentStore
 from mdscript.files_dependencies_manager import FilesDependenciesManager
-from mdscript.watcher import Watcher
+from mdscript.git_dirty_set import GitState, get_repository_root, capture_git_state, get_changed_paths_since
+from mdscript.output_writer import OutputWriter, WrittenOutput, hash_content
+from mdscript.profiler import BuildProfiler
+from mdscript.tests_results_cache import TestsResultsCache, get_environment_versions
+from mdscript.transformers_cache import TransformersCache
+from mdscript.watcher import Watcher, is_source_filepath, normalize_path
+
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from mdscript.base_transformer import BaseTransformer
+    from mdscript.config import TransformerBlock
+
+
+_async_rendering_context: ContextVar[Tuple[List[str], bool]] = ContextVar('_async_rendering_context', default=(list(), False))
+
+
+class ProcessRenderResult(NamedTuple):
+    dependencies_edges: Optional[List[Tuple[str, str]]]
+    # None when the render of the file failed.
+    written_output: Optional[WrittenOutput]
+    # None when the output was already up to date, and has not been written.
 
 
 class Runner:
@@ -14,74 +44,677 @@ class Runner:
         self.base_dirpath = base_dirpath
         self.watcher = Watcher(runner=self)
         self.files_dependencies = FilesDependenciesManager(watcher=self.watcher)
+        self.build_manifest: Optional[BuildManifest] = (
+            BuildManifest(manifest_filepath=os.path.join(self.base_dirpath, self.config.build_manifest_filename))
+            if self.config.build_manifest_filename is not None else None
+        )
+        self.transformers_cache: Optional[TransformersCache] = (
+            TransformersCache(max_size=self.config.transformers_cache_size)
+            if self.config.transformers_cache_size > 0 else None
+        )
+        self.tests_results_cache: Optional[TestsResultsCache] = (
+            TestsResultsCache(
+                cache_filepath=os.path.join(self.base_dirpath, self.config.tests_results_cache_filename),
+                force=self.config.force_tests
+            ) if self.config.tests_results_cache_filename is not None else None
+        )
+        self.output_writer = OutputWriter()
+        self.content_store = ContentStore()
+        self.compiled_templates = CompiledTemplatesCache(content_store=self.content_store)
+        self.profiler = BuildProfiler(enabled=self.config.profile)
+        self._rendering_state = threading.local()
+        # The stack of the files being rendered is kept per thread, since multiple files can be rendered in parallel.
+        self._async_executor: Optional['ThreadPoolExecutor'] = None
+        self.build_lock = threading.RLock()
+        # Held while rendering for the watcher or for the daemon, so that their builds never render the same files at once.
+        self._included_paths_generations: Dict[str, int] = dict()
+        self._included_paths_lock = threading.Lock()
+        self.failed_files_count = 0
+        self.failed_tests_count = 0
+        self._git_repository_root: Optional[str] = None
+
+    def _render_content(self, source_filepath: str, source_content: str, run_test: bool) -> str:
+        rendering_stack: List[str] = getattr(self._rendering_state, 'stack', None)
+        if rendering_stack is None:
+            rendering_stack = self._rendering_state.stack = list()
+        if source_filepath in rendering_stack:
+            raise Exception(f"Circular inclusion of {source_filepath} : {' -> '.join([*rendering_stack, source_filepath])}")
+
+        rendering_stack.append(source_filepath)
+        self._rendering_state.run_test = run_test
+        try:
+            return self._render_content_blocks(source_filepath=source_filepath, source_content=source_content, run_test=run_test)
+        finally:
+            rendering_stack.pop()
+
+    def _run_block_test(self, transformer_instance: 'BaseTransformer') -> bool:
+        from mdscript.base_transformer import BaseTransformer
+        async_loop: Optional['asyncio.AbstractEventLoop'] = getattr(self._rendering_state, 'async_loop', None)
+        if async_loop is None or type(transformer_instance).atest is BaseTransformer.atest:
+            return transformer_instance.test()
+        # In the threads of an asyncio build, the blocks of the included files are tested concurrently, so their
+        # tests go through atest like the other blocks, since the test functions can redirect the sys.stdout of the
+        # whole process. The default atest is skipped, it would wait for a thread of the pool from one of them.
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(transformer_instance.atest(), async_loop).result()
+
+    def render_included_content(self, source_filepath: str, source_content: str) -> str:
+        # Used by the transformers including the content of other files, so that the included files can themselves
+        # use transformers. The dependencies found while rendering them will have the included file as parent.
+        # The tests thread renders outside of the build_lock, so it must not remove any dependency while the render
+        # thread records them in the manifest. A stale dependency it leaves can only cause an extra render, and is
+        # removed by the next build that renders the included file.
+        keeps_dependencies: bool = getattr(self._rendering_state, 'keeps_dependencies', False)
+        with self._included_paths_lock:
+            if keeps_dependencies is not True and self._included_paths_generations.get(source_filepath, None) != self.content_store.generation:
+                # The included file is rendered again since it or one of its dependencies changed, so like for the
+                # sources, its previous dependencies are removed. Only once per build, since a template can be
+                # rendered with different values, and each of its renders registers its dependencies.
+                self._included_paths_generations[source_filepath] = self.content_store.generation
+                self.files_dependencies.remove_parent_dependencies(parent_filepath=source_filepath)
+        return self._render_content(
+            source_filepath=source_filepath, source_content=source_content,
+            run_test=getattr(self._rendering_state, 'run_test', False)
+        )
+
+    def _render_content_blocks(self, source_filepath: str, source_content: str, run_test: bool) -> str:
+        rendered_content_parts: List[str] = list()
+        last_block_end: int = 0
+
+        # The config holds a single compiled regex tasked with finding any transformer, and we only slice the
+        # source content between the blocks offsets, so that the whole file is rendered in a single pass.
+        for block in self.config.iter_transformers_blocks(content=source_content):
+            transformer_class_type = self.config.transformers.get(block.name, None)
+            if transformer_class_type is None:
+                raise Exception(f"No transformer found for {block.name} at offset {block.start} of {source_filepath}")
+
+            transformer_instance = transformer_class_type(
+                runner=self, source_filepath=source_filepath, attribute=block.attribute
+            )
+            if run_test is True:
+                with self.profiler.span(BuildProfiler.CATEGORY_TEST, block.name, source=source_filepath, attribute=block.attribute):
+                    self._record_test_result(self._run_block_test(transformer_instance), block=block, source_filepath=source_filepath)
+
+            rendered_content_parts.append(source_content[last_block_end:block.start])
+            with self.profiler.span(BuildProfiler.CATEGORY_TRANSFORMER, block.name, source=source_filepath, attribute=block.attribute):
+                rendered_content_parts.append(transformer_instance.render())
+            last_block_end = block.end
+
+        rendered_content_parts.append(source_content[last_block_end:])
+        return ''.join(rendered_content_parts)
 
     def _run_in_file(self, source_filepath: str, output_filepath: str, run_test: bool):
+        with self.profiler.span(BuildProfiler.CATEGORY_FILE, source_filepath) as span_args:
+            self._render_file(source_filepath=source_filepath, output_filepath=output_filepath, run_test=run_test, span_args=span_args)
+
+    def _render_file(self, source_filepath: str, output_filepath: str, run_test: bool, span_args: dict):
         try:
-            with open(source_filepath, 'r') as source_markdown_file:
-                source_file_content = source_markdown_file.read()
+            self.files_dependencies.remove_parent_dependencies(parent_filepath=source_filepath)
+            if self._should_stream(source_filepath=source_filepath):
+                bytes_read, bytes_written = self._stream_render_file(
+                    source_filepath=source_filepath, output_filepath=output_filepath, run_test=run_test
+                )
+            else:
+                bytes_read, bytes_written = self._render_whole_file(
+                    source_filepath=source_filepath, output_filepath=output_filepath, run_test=run_test
+                )
+            self._record_rendered_file(
+                source_filepath=source_filepath, output_filepath=output_filepath,
+                span_args=span_args, bytes_read=bytes_read, bytes_written=bytes_written
+            )
+        except Exception as e:
+            self._record_failed_file(span_args=span_args, exception=e, source_filepath=source_filepath)
 
-                rendered_file_content = ""
-                remaining_unprocessed_file_content = source_file_content
+    def _should_stream(self, source_filepath: str) -> bool:
+        streaming_threshold_bytes: Optional[int] = self.config.streaming_threshold_bytes
+        return streaming_threshold_bytes is not None and os.path.getsize(source_filepath) > streaming_threshold_bytes
 
-                transformers_names_selectors: str = '|'.join(self.config.transformers.keys())
-                transformers_regex = '({{)' + f'({transformers_names_selectors})' + '(::)((.|\n)*?)(::}})'
-                # Instead of looking for each transformer one by one, we create a simple regex tasked with finding any transformer
+    def _record_rendered_file(self, source_filepath: str, output_filepath: str, span_args: dict, bytes_read: int, bytes_written: int):
+        span_args.update({'bytes_read': bytes_read, 'bytes_written': bytes_written})
+        self.profiler.increment('bytes_read', bytes_read)
+        self.profiler.increment('bytes_written', bytes_written)
 
-                for match in re.finditer(pattern=transformers_regex, string=source_file_content):
-                    match_start = match.start()
-                    match_end = match.end()
+        if self.build_manifest is not None:
+            self.build_manifest.record(
+                source_filepath=source_filepath, output_filepath=output_filepath,
+                dependencies_edges=self.files_dependencies.get_dependencies_edges(parent_filepath=source_filepath)
+            )
 
-                    index_relative_to_remaining_unprocessed = len(source_file_content) - len(remaining_unprocessed_file_content)
-                    unprocessed_text_pre_match = remaining_unprocessed_file_content[0:match_start - index_relative_to_remaining_unprocessed]
-                    remaining_unprocessed_file_content = remaining_unprocessed_file_content[match_end - index_relative_to_remaining_unprocessed:]
+    def _record_failed_file(self, span_args: dict, exception: Exception, source_filepath: Optional[str] = None):
+        if source_filepath is not None and self.build_manifest is not None:
+            self.build_manifest.discard(source_filepath)
+            # The previous entry of the file would otherwise be trusted by the next builds, while its output is outdated.
+        self.failed_files_count += 1
+        span_args['error'] = str(exception)
+        self.profiler.increment('files_failed')
+        logging.warning(exception)
 
-                    transformer_name = match[2]
-                    transformer_attribute = match[4]
-                    transformer_class_type = self.config.transformers.get(transformer_name, None)
-                    if transformer_class_type is None:
-                        raise Exception(f"No transformer found for {transformer_name}")
+    def _record_test_result(self, test_passed: bool, block: 'TransformerBlock', source_filepath: str):
+        if test_passed is not False:
+            return
+        self.failed_tests_count += 1
+        # The tests are only ever run by one thread at a time : the thread of the build when starting the Runner, then
+        # the thread of the DebouncedTestsQueue, since the watcher and the daemon render without tests. So only one
+        # thread updates the count, even if the tests thread runs outside of the build_lock.
+        self.profiler.increment('tests_failed')
+        logging.warning(f"Test of {block.name} failed at offset {block.start} of {source_filepath}")
 
-                    transformer_instance = transformer_class_type(
-                        runner=self, source_filepath=source_filepath, attribute=transformer_attribute
-                    )
-                    if run_test is True:
-                        transformer_instance.test()
+    def _render_whole_file(self, source_filepath: str, output_filepath: str, run_test: bool) -> Tuple[int, int]:
+        source_file_content = self.content_store.read_text(source_filepath)
+        rendered_file_content = self._render_content(
+            source_filepath=source_filepath, source_content=source_file_content, run_test=run_test
+        )
+        is_written = self.output_writer.write(output_filepath=output_filepath, content=rendered_file_content)
+        return len(source_file_content.encode('utf-8')), len(rendered_file_content.encode('utf-8')) if is_written else 0
 
-                    transformed_content = transformer_instance.transform()
-                    rendered_file_content += f"{unprocessed_text_pre_match}{transformed_content}"
-                rendered_file_content += remaining_unprocessed_file_content
+    def _iter_stream_rendered_chunks(self, source_filepath: str, source_markdown_file: TextIO, run_test: bool) -> Iterator[Tuple[int, str]]:
+        pending_content: str = ''
+        while True:
+            chunk = source_markdown_file.read(self.config.streaming_chunk_size)
+            pending_content += chunk
+            # When the end of the file is reached, a block that has not been closed is only text, like it would
+            # have been in a file rendered at once. Otherwise, the content after the last complete block is kept
+            # with the next chunk if it might be the beginning of a block.
+            renderable_end = len(pending_content) if not len(chunk) > 0 else self.config.find_renderable_end(pending_content)
+            rendered_content: str = ''
+            if renderable_end > 0:
+                rendered_content = self._render_content(
+                    source_filepath=source_filepath, source_content=pending_content[:renderable_end], run_test=run_test
+                )
+                pending_content = pending_content[renderable_end:]
+            yield len(chunk.encode('utf-8')), rendered_content
+            if not len(chunk) > 0:
+                break
 
-                with open(output_filepath, 'w+') as output_file:
-                    output_file.write(rendered_file_content)
+    def _stream_render_file(self, source_filepath: str, output_filepath: str, run_test: bool) -> Tuple[int, int]:
+        bytes_read: int = 0
+        with open(source_filepath, 'r') as source_markdown_file, self.output_writer.open_stream(output_filepath) as output_stream:
+            for chunk_bytes_read, rendered_content in self._iter_stream_rendered_chunks(source_filepath, source_markdown_file, run_test):
+                bytes_read += chunk_bytes_read
+                if len(rendered_content) > 0:
+                    output_stream.write(rendered_content)
+        return bytes_read, output_stream.bytes_written if output_stream.written is True else 0
+
+    def _render_file_hash(self, source_filepath: str, run_test: bool) -> str:
+        if not self._should_stream(source_filepath=source_filepath):
+            return hash_content(self._render_content(
+                source_filepath=source_filepath, source_content=self.content_store.read_text(source_filepath), run_test=run_test
+            ))
+        # The large sources are still rendered by chunks, and only the hash of their output is kept in memory.
+        content_hash = hashlib.sha1()
+        with open(source_filepath, 'r') as source_markdown_file:
+            for _, rendered_content in self._iter_stream_rendered_chunks(source_filepath, source_markdown_file, run_test):
+                content_hash.update(rendered_content.encode('utf-8'))
+        return content_hash.hexdigest()
+
+    def run_file_tests(self, source_filepath: str) -> bool:
+        # Runs the tests of a source file, including the tests of the files it includes, without writing its output.
+        # The content is rendered in memory, which mostly hits the transformers cache, and the tests results cache
+        # only runs the samples whose inputs changed, so this stays fast enough to be run for each modification.
+        # It runs outside of the build_lock, so that a slow sample never blocks the render thread. Both threads can
+        # render the same file, which is safe since the transformers cache, the content store and the dependencies
+        # graph are locked, and the tests thread only adds the dependencies the file has when it is rendered. The
+        # keeps_dependencies flag prevents render_included_content from removing the previous dependencies of the
+        # included files, and the tests thread never writes an output or a manifest entry.
+        failed_tests_count = self.failed_tests_count
+        self._rendering_state.keeps_dependencies = True
+        try:
+            self._render_file_hash(source_filepath=source_filepath, run_test=True)
         except Exception as e:
-            logging.warning(e)
+            logging.warning(f"Could not run the tests of {source_filepath} : {e}")
+            return False
+        finally:
+            self._rendering_state.keeps_dependencies = False
+            if self.tests_results_cache is not None:
+                self.tests_results_cache.save()
+                # Saved here, since the render of the same files usually finishes before the tests and saves before them.
+        new_failed_tests_count = self.failed_tests_count - failed_tests_count
+        if new_failed_tests_count > 0:
+            logging.warning(f"{new_failed_tests_count} tests failed in {source_filepath}")
+            return False
+        logging.info(f"Tests passed in {source_filepath}")
+        return True
+
+    def _check_file(self, source_filepath: str, output_filepath: str, run_test: bool) -> Optional[bool]:
+        # Renders the file in memory and compares it with its current output, without writing anything. The build
+        # manifest is not updated either, since its entry would otherwise describe an output that was never written.
+        with self.profiler.span(BuildProfiler.CATEGORY_FILE, source_filepath) as span_args:
+            try:
+                self.files_dependencies.remove_parent_dependencies(parent_filepath=source_filepath)
+                rendered_content_hash = self._render_file_hash(source_filepath=source_filepath, run_test=run_test)
+            except Exception as e:
+                self._record_failed_file(span_args=span_args, exception=e)
+                return None
+            is_up_to_date = self.output_writer.has_content_hash(output_filepath=output_filepath, content_hash=rendered_content_hash)
+            span_args['stale'] = not is_up_to_date
+            return is_up_to_date
 
     def _run_with_filepath(self, source_filepath: str, run_test: bool):
+        with self._incremental_build():
+            self._run_in_source_file(source_filepath=source_filepath, run_test=run_test)
+
+    def _run_in_source_file(self, source_filepath: str, run_test: bool):
         source_filepath_object = Path(source_filepath)
         formatted_output_filename = source_filepath_object.name[2:]
         output_filepath = os.path.join(source_filepath_object.parent, formatted_output_filename)
         self._run_in_file(source_filepath=source_filepath, output_filepath=output_filepath, run_test=run_test)
 
-    def _run_in_folder(self, dirpath: str, run_tests: bool):
+    @contextmanager
+    def _incremental_build(self) -> Iterator[None]:
+        # The files rendered together by the watcher or the daemon are one build, so the stored files are checked once
+        # against their mtime, in case an editor replaced one of them without the watcher receiving its event, and
+        # the manifest is saved once at the end of the build, instead of after each of the files.
+        with self.build_lock:
+            self.content_store.start_generation()
+            try:
+                yield
+            finally:
+                self._save_build_state()
+
+    def _save_build_state(self):
+        if self.build_manifest is not None:
+            self.build_manifest.save()
+        if self.tests_results_cache is not None:
+            self.tests_results_cache.save()
+
+    def collect_files_to_render(self, modified_filepath: str) -> List[str]:
+        self.content_store.invalidate(modified_filepath)
+        if self.transformers_cache is not None:
+            self.transformers_cache.invalidate_dependency(modified_filepath)
+            # The cached outputs of the transformers that used the modified file are removed before
+            # we render again the parents of the file found in the dependencies_to_parents index.
+
+        filepaths_to_render: List[str] = [modified_filepath] if is_source_filepath(modified_filepath) else list()
+        for affected_filepath in self.files_dependencies.get_affected_parents(modified_filepath):
+            # The affected parents include the parts that include the modified file, the parts that includes those
+            # parts, etc, in topological order. Only the mdscript source files among them needs to be rendered.
+            if is_source_filepath(affected_filepath):
+                filepaths_to_render.append(affected_filepath)
+        return filepaths_to_render
+
+    def _restore_if_up_to_date(self, source_filepath: str, output_filepath: str) -> bool:
+        if self.build_manifest is None or not self.build_manifest.is_up_to_date(source_filepath, output_filepath):
+            return False
+        self._restore_dependencies(source_filepath=source_filepath)
+        return True
+
+    def _restore_dependencies(self, source_filepath: str):
+        for parent_path, dependency_path in self.build_manifest.get_dependencies_edges(source_filepath):
+            self.files_dependencies.add_dependency(parent_filepath=parent_path, dependency_path=dependency_path)
+        # Even if the file does not need to be rendered, its dependencies must be registered
+        # like if it had been rendered, so that the watcher will still react to their changes.
+
+    def _get_git_repository_root(self) -> Optional[str]:
+        if self.build_manifest is None or self.config.use_git_dirty_set is not True:
+            return None
+        if self._git_repository_root is None:
+            self._git_repository_root = get_repository_root(self.base_dirpath) or ''
+            # An empty string is kept when the base_dirpath is not in a git repository, to only look for it once.
+        return self._git_repository_root or None
+
+    def _get_git_state_kind(self, run_tests: bool) -> str:
+        return BuildManifest.GIT_STATE_TESTS if run_tests is True else BuildManifest.GIT_STATE_BUILD
+
+    def _get_git_changed_paths(self, run_tests: bool) -> Optional[Set[str]]:
+        repository_root: Optional[str] = self._get_git_repository_root()
+        if repository_root is None:
+            return None
+        git_state: Optional[GitState] = self.build_manifest.get_git_state(
+            kind=self._get_git_state_kind(run_tests=run_tests), environment=get_environment_versions()
+        )
+        if git_state is None:
+            return None
+        return get_changed_paths_since(repository_root=repository_root, git_state=git_state)
+
+    def _is_unchanged_since_git_state(self, source_filepath: str, output_filepath: str, changed_paths: Set[str]) -> bool:
+        recorded_paths: Optional[List[str]] = self.build_manifest.get_recorded_paths(source_filepath, output_filepath)
+        if recorded_paths is None:
+            return False
+        for path in recorded_paths:
+            normalized_path = normalize_path(path)
+            if normalized_path in changed_paths:
+                return False
+            if not normalized_path.startswith(self._git_repository_root + os.sep) or not os.path.exists(normalized_path):
+                # The files outside of the repository cannot be diffed, so the file is checked with its hashes instead.
+                return False
+        return True
+
+    def _record_git_state(self, git_state: Optional[GitState], run_tests: bool, failed_files_count: int, failed_tests_count: int):
+        if git_state is None:
+            return
+        environment = get_environment_versions()
+        self.build_manifest.record_git_state(kind=BuildManifest.GIT_STATE_BUILD, git_state=git_state, environment=environment)
+        if run_tests is True and self.failed_files_count == failed_files_count and self.failed_tests_count == failed_tests_count:
+            # The tests of the files that did not change since this state can be skipped, only if they all passed.
+            self.build_manifest.record_git_state(kind=BuildManifest.GIT_STATE_TESTS, git_state=git_state, environment=environment)
+
+    def _collect_folder_files(self, dirpath: str) -> List[Tuple[str, str]]:
+        files_paths: List[Tuple[str, str]] = list()
         for root_dirpath, dirs, filenames in os.walk(dirpath):
             for filename in filenames:
                 if filename[0:2] == '__':
                     source_filepath = os.path.join(root_dirpath, filename)
                     output_filename = filename[2:]
                     output_filepath = os.path.join(root_dirpath, output_filename)
-                    self._run_in_file(source_filepath=source_filepath, output_filepath=output_filepath, run_test=run_tests)
+                    files_paths.append((source_filepath, output_filepath))
+        return files_paths
+
+    def _collect_folder_files_to_render(self, dirpath: str, run_tests: bool) -> List[Tuple[str, str]]:
+        files_paths_to_render: List[Tuple[str, str]] = list()
+        changed_paths: Optional[Set[str]] = self._get_git_changed_paths(run_tests=run_tests)
+        # The paths changed since the commit of the last build, or of the last build that ran the tests. The files
+        # whose source, output and dependencies did not change are skipped without hashing any of them, so a clone
+        # or a branch switch only renders the pages affected by the changes, and only runs their tests.
+        folder_files_paths: List[Tuple[str, str]] = self._collect_folder_files(dirpath=dirpath)
+        if self.build_manifest is not None and normalize_path(dirpath) == normalize_path(self.base_dirpath):
+            self.build_manifest.retain(source_filepaths=[source_filepath for source_filepath, output_filepath in folder_files_paths])
+        for source_filepath, output_filepath in folder_files_paths:
+            if changed_paths is not None and self._is_unchanged_since_git_state(source_filepath, output_filepath, changed_paths):
+                self._restore_dependencies(source_filepath=source_filepath)
+                continue
+            if run_tests is not True and self._restore_if_up_to_date(source_filepath, output_filepath):
+                # When running the tests, we always need to go through the transformers, so
+                # we can only skip the files whose inputs did not changed since the last build.
+                continue
+            files_paths_to_render.append((source_filepath, output_filepath))
+        return files_paths_to_render
+
+    def _map_folder_files(self, function: Callable[[str, str, bool], Any], files_paths: List[Tuple[str, str]], run_tests: bool) -> List[Any]:
+        render_workers: int = self.config.render_workers or os.cpu_count() or 1
+        if render_workers > 1 and run_tests is not True and len(files_paths) > 1:
+            # The tests are redirecting the sys.stdout to retrieve the output of the samples, so
+            # they cannot run in parallel, and we only use the thread pool when rendering without tests.
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=render_workers) as executor:
+                return list(executor.map(function, *zip(*files_paths), [False] * len(files_paths)))
+        return [function(source_filepath, output_filepath, run_tests) for source_filepath, output_filepath in files_paths]
+
+    def _run_in_folder(self, dirpath: str, run_tests: bool):
+        failed_files_count, failed_tests_count = self.failed_files_count, self.failed_tests_count
+        git_state: Optional[GitState] = self._capture_git_state()
+        self.content_store.start_generation()
+        files_paths_to_render: List[Tuple[str, str]] = self._collect_folder_files_to_render(dirpath=dirpath, run_tests=run_tests)
+        if self.config.use_render_processes is True and run_tests is not True and len(files_paths_to_render) > 1:
+            self._run_in_processes(files_paths=files_paths_to_render)
+        else:
+            self._map_folder_files(self._run_in_file, files_paths=files_paths_to_render, run_tests=run_tests)
+        self._record_git_state(git_state, run_tests=run_tests, failed_files_count=failed_files_count, failed_tests_count=failed_tests_count)
+        self._save_build_state()
+
+    def _run_in_processes(self, files_paths: List[Tuple[str, str]]):
+        from concurrent.futures import ProcessPoolExecutor
+        process_config = copy.copy(self.config)
+        process_config.build_manifest_filename = None
+        process_config.tests_results_cache_filename = None
+        process_config.profile = False
+        # The processes only render the files, the manifest is recorded by this Runner with the edges they return.
+        render_workers: int = self.config.render_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=render_workers, initializer=_init_render_process, initargs=(process_config, self.base_dirpath)) as executor:
+            files_results: List[ProcessRenderResult] = list(executor.map(
+                _render_in_process, *zip(*files_paths), chunksize=max(len(files_paths) // (render_workers * 4), 1)
+            ))
+
+        rendered_edges: List[Tuple[str, str]] = [
+            edge for file_result in files_results if file_result.dependencies_edges is not None for edge in file_result.dependencies_edges
+        ]
+        for parent_filepath in {source_filepath for source_filepath, output_filepath in files_paths} | {parent for parent, dependency in rendered_edges}:
+            # Like when rendering in this process, the previous dependencies of the rendered files are removed
+            # before the new ones are merged, including the ones of the files they include.
+            self.files_dependencies.remove_parent_dependencies(parent_filepath=parent_filepath)
+        for parent_filepath, dependency_path in rendered_edges:
+            self.files_dependencies.add_dependency(parent_filepath=parent_filepath, dependency_path=dependency_path)
+
+        for (source_filepath, output_filepath), file_result in zip(files_paths, files_results):
+            if file_result.dependencies_edges is None:
+                # The error has already been logged by the process that rendered the file.
+                self.failed_files_count += 1
+                if self.build_manifest is not None:
+                    self.build_manifest.discard(source_filepath)
+                continue
+            self.output_writer.add_process_write(output_filepath=output_filepath, written_output=file_result.written_output)
+            # Our writes are known to the watcher, even when they were made by the processes.
+            if self.build_manifest is not None:
+                self.build_manifest.record(
+                    source_filepath=source_filepath, output_filepath=output_filepath, dependencies_edges=file_result.dependencies_edges
+                )
+
+    def _capture_git_state(self) -> Optional[GitState]:
+        # Captured before the files are read, so that a file modified during the build will be rendered again by the next one.
+        repository_root: Optional[str] = self._get_git_repository_root()
+        return capture_git_state(repository_root=repository_root) if repository_root is not None else None
+
+    def _check_folder(self, dirpath: str, run_tests: bool) -> List[str]:
+        self.content_store.start_generation()
+        files_paths_to_check = self._collect_folder_files_to_render(dirpath=dirpath, run_tests=run_tests)
+        # The files that the build manifest considers up to date are not rendered again, since their
+        # output has been verified to be the one that was written by the build that recorded them.
+        files_are_up_to_date: List[Optional[bool]] = self._map_folder_files(self._check_file, files_paths=files_paths_to_check, run_tests=run_tests)
+        return [
+            output_filepath for (source_filepath, output_filepath), is_up_to_date
+            in zip(files_paths_to_check, files_are_up_to_date) if is_up_to_date is False
+        ]
+
+    def _call_with_rendering_state(
+            self, function: Callable[[], Any], rendering_stack: List[str], run_test: bool, async_loop: 'asyncio.AbstractEventLoop'
+    ) -> Any:
+        previous_rendering_stack = getattr(self._rendering_state, 'stack', None)
+        previous_run_test = getattr(self._rendering_state, 'run_test', False)
+        previous_async_loop = getattr(self._rendering_state, 'async_loop', None)
+        self._rendering_state.stack = list(rendering_stack)
+        self._rendering_state.run_test = run_test
+        self._rendering_state.async_loop = async_loop
+        try:
+            return function()
+        finally:
+            self._rendering_state.stack = previous_rendering_stack
+            self._rendering_state.run_test = previous_run_test
+            self._rendering_state.async_loop = previous_async_loop
+
+    async def run_blocking(self, function: Callable[[], Any]) -> Any:
+        # Runs a synchronous function in the threads of the asyncio build. The function will see the same rendering
+        # stack as if it was called by the synchronous Runner, so that the transformers including other files can
+        # still detect circular inclusions, and know if the tests must be run for the included files.
+        import asyncio
+        rendering_stack, run_test = _async_rendering_context.get()
+        async_loop = asyncio.get_running_loop()
+        return await async_loop.run_in_executor(self._async_executor, functools.partial(
+            self._call_with_rendering_state, function, rendering_stack, run_test, async_loop
+        ))
+
+    async def _arender_block(self, transformer_instance: 'BaseTransformer', block: 'TransformerBlock', source_filepath: str) -> str:
+        with self.profiler.span(BuildProfiler.CATEGORY_TRANSFORMER, block.name, source=source_filepath, attribute=block.attribute):
+            return await transformer_instance.arender()
+
+    async def _atest_block(self, transformer_instance: 'BaseTransformer', block: 'TransformerBlock', source_filepath: str) -> bool:
+        with self.profiler.span(BuildProfiler.CATEGORY_TEST, block.name, source=source_filepath, attribute=block.attribute):
+            test_passed: bool = await transformer_instance.atest()
+        self._record_test_result(test_passed, block=block, source_filepath=source_filepath)
+        return test_passed
+
+    async def _arender_content_blocks(self, source_filepath: str, source_content: str, run_test: bool) -> str:
+        import asyncio
+        blocks: List['TransformerBlock'] = list(self.config.iter_transformers_blocks(content=source_content))
+        transformers_instances: List['BaseTransformer'] = list()
+        for block in blocks:
+            transformer_class_type = self.config.transformers.get(block.name, None)
+            if transformer_class_type is None:
+                raise Exception(f"No transformer found for {block.name} at offset {block.start} of {source_filepath}")
+            transformers_instances.append(transformer_class_type(
+                runner=self, source_filepath=source_filepath, attribute=block.attribute
+            ))
+
+        if run_test is True:
+            await asyncio.gather(*(
+                self._atest_block(transformer_instance, block, source_filepath)
+                for transformer_instance, block in zip(transformers_instances, blocks)
+            ))
+        # The blocks are rendered concurrently, but gather returns their results in the order of the blocks,
+        # so the output is the same as the one of the synchronous Runner, whatever block finished first.
+        rendered_blocks: List[str] = await asyncio.gather(*(
+            self._arender_block(transformer_instance, block, source_filepath)
+            for transformer_instance, block in zip(transformers_instances, blocks)
+        ))
+
+        rendered_content_parts: List[str] = list()
+        last_block_end: int = 0
+        for block, rendered_block in zip(blocks, rendered_blocks):
+            rendered_content_parts.append(source_content[last_block_end:block.start])
+            rendered_content_parts.append(rendered_block)
+            last_block_end = block.end
+        rendered_content_parts.append(source_content[last_block_end:])
+        return ''.join(rendered_content_parts)
+
+    async def _arun_in_file(self, source_filepath: str, output_filepath: str, run_test: bool):
+        with self.profiler.span(BuildProfiler.CATEGORY_FILE, source_filepath) as span_args:
+            try:
+                self.files_dependencies.remove_parent_dependencies(parent_filepath=source_filepath)
+                if self._should_stream(source_filepath=source_filepath):
+                    _async_rendering_context.set((list(), run_test))
+                    # The streamed file is rendered by the synchronous _render_content, which adds the file
+                    # to the rendering stack itself, so it must not already be in the stack of the thread.
+                    bytes_read, bytes_written = await self.run_blocking(functools.partial(
+                        self._stream_render_file, source_filepath, output_filepath, run_test
+                    ))
+                else:
+                    _async_rendering_context.set(([source_filepath], run_test))
+                    # Each file is rendered in its own asyncio task, which has its own copy of the context.
+                    source_file_content: str = await self.run_blocking(functools.partial(self.content_store.read_text, source_filepath))
+                    rendered_file_content = await self._arender_content_blocks(
+                        source_filepath=source_filepath, source_content=source_file_content, run_test=run_test
+                    )
+                    is_written: bool = await self.run_blocking(functools.partial(
+                        self.output_writer.write, output_filepath, rendered_file_content
+                    ))
+                    bytes_read = len(source_file_content.encode('utf-8'))
+                    bytes_written = len(rendered_file_content.encode('utf-8')) if is_written else 0
+                self._record_rendered_file(
+                    source_filepath=source_filepath, output_filepath=output_filepath,
+                    span_args=span_args, bytes_read=bytes_read, bytes_written=bytes_written
+                )
+            except Exception as e:
+                self._record_failed_file(span_args=span_args, exception=e, source_filepath=source_filepath)
+
+    async def _arun_in_folder(self, dirpath: str, run_tests: bool):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        failed_files_count, failed_tests_count = self.failed_files_count, self.failed_tests_count
+        git_state: Optional[GitState] = self._capture_git_state()
+        files_paths_to_render: List[Tuple[str, str]] = self._collect_folder_files_to_render(dirpath=dirpath, run_tests=run_tests)
+        self.content_store.start_generation()
+        with ThreadPoolExecutor(max_workers=self.config.render_workers or os.cpu_count() or 1) as self._async_executor:
+            # Unlike the synchronous Runner, the tests can run concurrently with asyncio, since the
+            # transformers implementing atest must not rely on the sys.stdout of the Runner process.
+            await asyncio.gather(*(
+                self._arun_in_file(source_filepath=source_filepath, output_filepath=output_filepath, run_test=run_tests)
+                for source_filepath, output_filepath in files_paths_to_render
+            ))
+        self._async_executor = None
+
+        self._record_git_state(git_state, run_tests=run_tests, failed_files_count=failed_files_count, failed_tests_count=failed_tests_count)
+        self._save_build_state()
+
+    def _build_folder(self, run_tests: bool):
+        if self.config.use_asyncio is True:
+            import asyncio
+            asyncio.run(self._arun_in_folder(dirpath=self.base_dirpath, run_tests=run_tests))
+        else:
+            self._run_in_folder(dirpath=self.base_dirpath, run_tests=run_tests)
+
+    def build(self, run_tests: bool = False) -> int:
+        # Renders the base_dirpath folder once and returns, instead of watching it, for the CI and the scripts.
+        # The returned status code is 0 if every file has been rendered and every test passed, and 1 otherwise.
+        failed_files_count, failed_tests_count = self.failed_files_count, self.failed_tests_count
+        self._build_folder(run_tests=run_tests)
+        if self.profiler.enabled is True:
+            self.log_profiling_summary()
+        return 0 if self.failed_files_count == failed_files_count and self.failed_tests_count == failed_tests_count else 1
+
+    def check(self, run_tests: bool = False) -> int:
+        # Like build, but nothing is written. The status code is 1 if any output is stale, meaning that it differs
+        # from what its source would render, or if a file could not be rendered or a test failed.
+        failed_files_count, failed_tests_count = self.failed_files_count, self.failed_tests_count
+        stale_outputs_filepaths: List[str] = self._check_folder(dirpath=self.base_dirpath, run_tests=run_tests)
+        if self.tests_results_cache is not None:
+            self.tests_results_cache.save()
+        for output_filepath in stale_outputs_filepaths:
+            logging.warning(f"Stale output : {output_filepath}")
+        logging.info(
+            f"Checked {self.base_dirpath} : {len(stale_outputs_filepaths)} stale outputs, {self.failed_files_count - failed_files_count} "
+            f"failed files, {self.failed_tests_count - failed_tests_count} failed tests"
+        )
+        if self.profiler.enabled is True:
+            self.log_profiling_summary()
+        has_failures = self.failed_files_count != failed_files_count or self.failed_tests_count != failed_tests_count
+        return 0 if len(stale_outputs_filepaths) == 0 and has_failures is not True else 1
 
     def _start(self, run_tests: bool):
-        self._run_in_folder(dirpath=self.base_dirpath, run_tests=run_tests)
+        self._build_folder(run_tests=run_tests)
         # When starting the runner, we first run the base_dirpath folder once, which
         # will build all of our mdscript files, and index all the dependency files.
-        self.watcher.start()
+        self.watcher.start(run_tests=run_tests)
         # Then, we simply start the watcher, which will always watch the entire base_dirpath
         # folder, and all of the dependencies files will have already been added to its watch.
 
+        if self.profiler.enabled is True:
+            self.log_profiling_summary()
+
+    def log_profiling_summary(self):
+        counters = {
+            'outputs_written': self.output_writer.writes_count, 'outputs_unchanged': self.output_writer.skipped_writes_count,
+            'content_store_reads': self.content_store.reads, 'content_store_hits': self.content_store.hits
+        }
+        if self.transformers_cache is not None:
+            counters.update({'transformers_cache_hits': self.transformers_cache.hits, 'transformers_cache_misses': self.transformers_cache.misses})
+        if self.tests_results_cache is not None:
+            counters.update({'tests_cache_hits': self.tests_results_cache.hits, 'tests_cache_misses': self.tests_results_cache.misses})
+        logging.info(f"Profiling summary :\n{self.profiler.format_summary(counters=counters)}")
+        if self.config.profile_trace_filepath is not None:
+            self.profiler.export_chrome_trace(trace_filepath=self.config.profile_trace_filepath)
+            logging.info(f"Profiling trace written to {self.config.profile_trace_filepath}")
+
     def start(self):
         self._start(run_tests=False)
 
+    def start_daemon(self, watch: bool = True):
+        # Like start, but the Runner also serves an http api to trigger the builds of some paths, and to retrieve
+        # its status and metrics, so that its caches and dependencies graph stay warm for the editors and the CI.
+        from mdscript.daemon import MDScriptDaemon
+        self._build_folder(run_tests=False)
+        daemon = MDScriptDaemon(runner=self, host=self.config.daemon_host, port=self.config.daemon_port)
+        if watch is True:
+            self.watcher.start_observer()
+        daemon.start()
+        try:
+            while True:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            daemon.stop()
+            if watch is True:
+                self.watcher.stop_observer()
+
+        if self.profiler.enabled is True:
+            self.log_profiling_summary()
+
     def start_with_tests(self):
         self._start(run_tests=True)
 
+
+_process_runner: Optional[Runner] = None
+# The Runner of a render process, created once per process by the initializer of the pool.
+
+
+def _init_render_process(config: Any, base_dirpath: str):
+    global _process_runner
+    _process_runner = Runner(config=config, base_dirpath=base_dirpath)
+
+
+def _render_in_process(source_filepath: str, output_filepath: str) -> ProcessRenderResult:
+    failed_files_count, writes_count = _process_runner.failed_files_count, _process_runner.output_writer.writes_count
+    _process_runner._run_in_file(source_filepath=source_filepath, output_filepath=output_filepath, run_test=False)
+    if _process_runner.failed_files_count != failed_files_count:
+        return ProcessRenderResult(dependencies_edges=None, written_output=None)
+    return ProcessRenderResult(
+        dependencies_edges=_process_runner.files_dependencies.get_dependencies_edges(parent_filepath=source_filepath),
+        written_output=_process_runner.output_writer.get_written_output(output_filepath=output_filepath)
+        if _process_runner.output_writer.writes_count != writes_count else None
+    )
@@ -0,0 +1,155 @@
+import importlib.util
+import json
+import os
+import sys
+import traceback
+from contextlib import redirect_stdout, nullcontext
+from functools import lru_cache
+from io import StringIO
+from typing import Optional, Any
+
+from mdscript.fixtures_seeder import seed_fixtures
+from mdscript.tables_clients_pool import TablesClientsPool
+
+
+USERS_TABLE_NAME = 'accounts-data'
+tables_clients_pool = TablesClientsPool()
+
+
+@lru_cache(maxsize=None)
+def get_users_table_model() -> type:
+    from StructNoSQL import TableDataModel
+    class UsersTableModel(TableDataModel):
+        pass
+    return UsersTableModel
+
+
+def make_users_table(data_model_class: type):
+    from StructNoSQL import DynamoDBBasicTable, PrimaryIndex
+    class UsersTable(DynamoDBBasicTable):
+        def __init__(self):
+            primary_index = PrimaryIndex(hash_key_name='userId', hash_key_variable_python_type=str)
+            super().__init__(
+                table_name=USERS_TABLE_NAME, region_name='eu-west-2',
+                data_model=data_model_class(), primary_index=primary_index,
+                auto_create_table=True
+            )
+    return UsersTable()
+
+
+def make_user_table():
+    return tables_clients_pool.get(
+        table_name=USERS_TABLE_NAME, data_model_class=get_users_table_model(), table_factory=make_users_table
+    )
+
+
+def make_sample_worker_env() -> dict:
+    # The workers are running in the directory of their sample, since the samples are opening their
+    # record.json with a relative path, so the mdscript package must be importable from anywhere.
+    mdscript_parent_dirpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    existing_python_path: Optional[str] = os.environ.get('PYTHONPATH', None)
+    return {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join([mdscript_parent_dirpath, existing_python_path])
+        if existing_python_path is not None else mdscript_parent_dirpath
+    }
+
+
+def normalize_sample_output(output: str) -> str:
+    output = output.strip('\n')
+    if output == 'None' or output.endswith('\nNone'):
+        # The None returned by the last expression of some samples ends up printed after their output.
+        output = output[:-len('None')].strip('\n')
+    return output
+
+
+def seed_sample_record(record_data: dict):
+    table_client = make_user_table()
+    table_client.dynamodb_client.put_record(item_dict=record_data)
+
+
+BACKEND_AWS = 'aws'
+BACKEND_LOCAL = 'local'
+BACKENDS = [BACKEND_AWS, BACKEND_LOCAL]
+
+_local_resource: Optional[Any] = None
+
+
+def prepare_backend(backend: str):
+    global _local_resource
+    if backend == BACKEND_LOCAL:
+        if _local_resource is None:
+            from mdscript.local_dynamodb import install_local_dynamodb
+            _local_resource = install_local_dynamodb()
+            # Must be installed before the sample record is seeded, since the seeding already creates a table client.
+        else:
+            tables_clients_pool.reset(local_resource=_local_resource)
+    elif backend == BACKEND_AWS:
+        if _local_resource is not None:
+            from StructNoSQL.clients_middlewares.dynamodb.backend.dynamodb_core import DynamoDbCoreAdapter
+            DynamoDbCoreAdapter._EXISTING_DATABASE_CLIENTS.clear()
+            tables_clients_pool.clear()
+            _local_resource = None
+            # The pooled clients were bound to the local resource, so they cannot be used with AWS.
+    else:
+        raise Exception(f"Unknown backend {backend}, must be one of {BACKENDS}")
+
+
+def run_sample(sample_dirpath: str, backend: str = BACKEND_AWS) -> str:
+    prepare_backend(backend=backend)
+
+    record_filepath = os.path.join(sample_dirpath, 'record.json')
+    with open(record_filepath, 'r') as record_file:
+        record_data = json.load(record_file)
+    code_filepath = os.path.join(sample_dirpath, 'code.py')
+    with open(code_filepath, 'r') as code_file:
+        code = code_file.read()
+
+    if isinstance(record_data, dict):
+        seed_sample_record(record_data=record_data)
+        fixtures_seeding = nullcontext()
+    else:
+        # The samples working with multiple records are putting them one by one. They are seeded with batch
+        # writes instead, and the puts of the sample for the records that have already been seeded are skipped.
+        fixtures_seeding = seed_fixtures(code=code, records_filepath=record_filepath)
+
+    buffer = StringIO()
+    with fixtures_seeding, redirect_stdout(buffer):
+        module_spec = importlib.util.spec_from_file_location("", code_filepath)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    return normalize_sample_output(buffer.getvalue())
+
+
+def serve(backend: str):
+    # Persistent worker mode, where the samples dirpaths are received one per line on stdin, and
+    # the result of each sample is written as a single json line. The interpreter startup, the
+    # imports of StructNoSQL and boto3, and the pooled tables clients are paid once per worker.
+    protocol_stream = sys.stdout
+    sys.stdout = sys.stderr
+    # Anything printed outside of the samples themselves must not be mixed with the json lines.
+    for line in sys.stdin:
+        sample_dirpath = line.rstrip('\n')
+        if not len(sample_dirpath) > 0:
+            continue
+        try:
+            os.chdir(sample_dirpath)
+            # The samples are opening their record.json with a relative path.
+            result = {'output': run_sample(sample_dirpath=sample_dirpath, backend=backend)}
+        except Exception:
+            result = {'error': traceback.format_exc()}
+        protocol_stream.write(json.dumps(result) + '\n')
+        protocol_stream.flush()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        serve(backend=sys.argv[2] if len(sys.argv) > 2 else BACKEND_AWS)
+    else:
+        # Runs a single sample. The output of the sample is written as json on
+        # the last line of stdout, so that it cannot be mixed with what the seeding printed.
+        sample_output = run_sample(
+            sample_dirpath=os.path.abspath(sys.argv[1]),
+            backend=sys.argv[2] if len(sys.argv) > 2 else BACKEND_AWS
+        )
+        sys.stdout.write('\n' + json.dumps({'output': sample_output}) + '\n')
@@ -0,0 +1,184 @@
+import difflib
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, NamedTuple
+
+import click
+
+from mdscript.sample_worker import BACKEND_AWS, BACKENDS, make_sample_worker_env
+
+
+class SampleTestResult(NamedTuple):
+    sample_dirpath: str
+    passed: bool
+    duration: float
+    output: Optional[str] = None
+    expected_output: Optional[str] = None
+    error: Optional[str] = None
+
+
+def discover_samples(samples_dirpath: str) -> List[str]:
+    samples_dirpaths: List[str] = list()
+    for root_dirpath, dirs, filenames in os.walk(samples_dirpath):
+        dirs[:] = [dirname for dirname in dirs if dirname != '__pycache__']
+        if 'code.py' in filenames and 'output.txt' in filenames:
+            samples_dirpaths.append(root_dirpath)
+    return sorted(samples_dirpaths)
+
+
+class SampleWorkerProcess:
+    def __init__(self, python_executable: str, backend: str, env: dict):
+        self.python_executable = python_executable
+        self.backend = backend
+        self.env = env
+        self._process: Optional[subprocess.Popen] = None
+        self._responses: Optional[queue.Queue] = None
+
+    def _spawn(self):
+        self._process = subprocess.Popen(
+            [self.python_executable, '-m', 'mdscript.sample_worker', '--serve', self.backend],
+            env=self.env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, bufsize=1
+        )
+        self._responses = queue.Queue()
+        # The responses are read by a thread, since reading from a pipe with a timeout is not portable.
+        threading.Thread(
+            target=self._read_responses, args=(self._process, self._responses), daemon=True
+        ).start()
+
+    @staticmethod
+    def _read_responses(process: subprocess.Popen, responses: queue.Queue):
+        for line in process.stdout:
+            responses.put(line)
+        responses.put(None)
+
+    def kill(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def close(self):
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process = None
+
+    def run_sample(self, sample_dirpath: str, timeout_seconds: float) -> dict:
+        if self._process is None:
+            self._spawn()
+        try:
+            self._process.stdin.write(sample_dirpath + '\n')
+            self._process.stdin.flush()
+            response_line: Optional[str] = self._responses.get(timeout=timeout_seconds)
+        except queue.Empty:
+            # A sample that hangs would block all the next samples sent to this worker,
+            # so the worker is killed, and a new one will be spawned for the next sample.
+            self.kill()
+            return {'error': f"Timed out after {timeout_seconds} seconds"}
+        except OSError as e:
+            self.kill()
+            return {'error': f"Could not send the sample to its worker : {e}"}
+
+        if response_line is None:
+            returncode = self._process.wait()
+            self._process = None
+            return {'error': f"Worker exited with code {returncode}"}
+        return json.loads(response_line)
+
+
+class SamplesTester:
+    def __init__(
+            self, workers: Optional[int] = None, timeout_seconds: float = 60,
+            python_executable: Optional[str] = None, backend: str = BACKEND_AWS
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout_seconds = timeout_seconds
+        self.python_executable = python_executable or sys.executable
+        self.backend = backend
+        # With the local backend, each worker uses its own in-memory DynamoDB, and no request is sent to AWS.
+        self._idle_workers: queue.Queue = queue.Queue()
+
+    def run_sample(self, sample_dirpath: str) -> SampleTestResult:
+        start_time = time.perf_counter()
+        with open(os.path.join(sample_dirpath, 'output.txt'), 'r') as expected_output_file:
+            expected_output = expected_output_file.read()
+
+        worker: SampleWorkerProcess = self._idle_workers.get()
+        try:
+            response: dict = worker.run_sample(sample_dirpath=sample_dirpath, timeout_seconds=self.timeout_seconds)
+        finally:
+            self._idle_workers.put(worker)
+
+        duration = time.perf_counter() - start_time
+        if 'error' in response:
+            return SampleTestResult(
+                sample_dirpath=sample_dirpath, passed=False, duration=duration,
+                expected_output=expected_output, error=response['error'].strip()
+            )
+        output: str = response['output']
+        return SampleTestResult(
+            sample_dirpath=sample_dirpath, passed=output == expected_output,
+            duration=duration, output=output, expected_output=expected_output
+        )
+
+    def run(self, samples_dirpaths: List[str]) -> List[SampleTestResult]:
+        workers_env = make_sample_worker_env()
+        workers = [
+            SampleWorkerProcess(python_executable=self.python_executable, backend=self.backend, env=workers_env)
+            for _ in range(min(self.workers, max(len(samples_dirpaths), 1)))
+        ]
+        for worker in workers:
+            self._idle_workers.put(worker)
+        try:
+            with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+                # The threads are only waiting for their worker subprocess, which executes the samples one after the
+                # other in isolation from the tester, and reuses its imports and tables clients between samples.
+                return list(executor.map(self.run_sample, samples_dirpaths))
+        finally:
+            for worker in workers:
+                worker.close()
+            self._idle_workers = queue.Queue()
+
+
+def format_report(results: List[SampleTestResult]) -> str:
+    report_lines: List[str] = list()
+    for result in results:
+        if result.passed is True:
+            continue
+        report_lines.append(f"FAILED {result.sample_dirpath} ({result.duration:.2f}s)")
+        if result.error is not None:
+            report_lines.append(result.error)
+        else:
+            report_lines.extend(difflib.unified_diff(
+                (result.expected_output or '').splitlines(), (result.output or '').splitlines(),
+                fromfile='output.txt', tofile='stdout', lineterm=''
+            ))
+        report_lines.append('')
+
+    num_passed = sum(1 for result in results if result.passed is True)
+    total_duration = sum(result.duration for result in results)
+    report_lines.append(f"{num_passed}/{len(results)} samples passed ({total_duration:.2f}s of samples execution)")
+    return '\n'.join(report_lines)
+
+
+@click.command()
+@click.option('--samples-dirpath', '-s', type=str, default='samples')
+@click.option('--workers', '-w', type=int, default=None)
+@click.option('--timeout', '-t', type=float, default=60)
+@click.option('--backend', '-b', type=click.Choice(BACKENDS), default=BACKEND_AWS)
+def run_samples_tests(samples_dirpath: str, workers: Optional[int], timeout: float, backend: str):
+    samples_dirpaths = [os.path.abspath(dirpath) for dirpath in discover_samples(samples_dirpath=samples_dirpath)]
+    results = SamplesTester(workers=workers, timeout_seconds=timeout, backend=backend).run(samples_dirpaths=samples_dirpaths)
+    click.echo(format_report(results=results))
+    sys.exit(0 if all(result.passed is True for result in results) else 1)
+
+
+if __name__ == '__main__':
+    run_samples_tests()
@@ -6,6 +6,7 @@ setup(
     packages=['mdscript', 'mdscript.transformers'],
     include_package_data=True,
     install_requires=["click", "watchdog"],
+    entry_points={'console_scripts': ['mdscript=mdscript.cli:cli']},
     url="https://github.com/Robinson04/mdscript",
     license="MIT",
     author="Inoft",
@@ -0,0 +1,49 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def get_model_fingerprint(data_model_class: type) -> str:
+    # Two models with the same fields can share the same indexed table client, even if they
+    # are different class objects, like the ones re-declared on every execution of a sample.
+    fields_descriptions = sorted(
+        f"{key}:{type(value).__module__}.{type(value).__qualname__}:{getattr(value, 'field_type', None)!r}"
+        for key, value in vars(data_model_class).items() if not key.startswith('__')
+    )
+    return hashlib.sha1('\n'.join(fields_descriptions).encode('utf-8')).hexdigest()
+
+
+class TablesClientsPool:
+    def __init__(self):
+        self._tables_clients: Dict[Tuple[str, str], Any] = dict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, table_name: str, data_model_class: type, table_factory: Callable[[type], Any]) -> Any:
+        key = (table_name, get_model_fingerprint(data_model_class))
+        with self._lock:
+            table_client: Optional[Any] = self._tables_clients.get(key, None)
+            if table_client is not None:
+                self.hits += 1
+                return table_client
+            self.misses += 1
+            # Instantiating a table indexes its whole model into its fields_switch, and checks
+            # if the table exists, so it is only done once per table name and model.
+            table_client = table_factory(data_model_class)
+            self._tables_clients[key] = table_client
+            return table_client
+
+    def reset(self, local_resource: Optional[Any] = None):
+        # Called between two samples. The pooled clients are kept, but when using the local backend, all
+        # the tables are dropped, and the tables of the pooled clients are created again, empty.
+        if local_resource is None:
+            return
+        local_resource.reset()
+        with self._lock:
+            for table_client in self._tables_clients.values():
+                table_client.dynamodb_client._create_table_if_not_exists()
+
+    def clear(self):
+        with self._lock:
+            self._tables_clients.clear()
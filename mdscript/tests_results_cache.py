@@ -0,0 +1,89 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Iterable, NamedTuple
+
+
+class TestResult(NamedTuple):
+    passed: bool
+    output: str
+
+
+@lru_cache(maxsize=None)
+def get_installed_version(distribution_name: str) -> Optional[str]:
+    # Read from the metadata of the installed distribution, so that StructNoSQL does not need to be imported.
+    from importlib import metadata
+    try:
+        return metadata.version(distribution_name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def get_environment_versions() -> Dict[str, Optional[str]]:
+    import mdscript
+    return {'mdscript': mdscript.__version__, 'StructNoSQL': get_installed_version('StructNoSQL')}
+
+
+class TestsResultsCache:
+    VERSION = 1
+
+    def __init__(self, cache_filepath: str, force: bool = False):
+        self.cache_filepath = cache_filepath
+        self.force = force
+        # When forced, every test is run again, but their results are still stored to refresh the cache.
+        self._entries: Dict[str, dict] = dict()
+        self._lock = threading.Lock()
+        self._has_pending_changes = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.cache_filepath):
+            return
+        try:
+            with open(self.cache_filepath, 'r') as cache_file:
+                cache_data: dict = json.load(cache_file)
+            if cache_data.get('version', None) == self.VERSION:
+                self._entries = cache_data.get('entries', dict())
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load the tests results cache at {self.cache_filepath} : {e}")
+
+    def save(self):
+        with self._lock:
+            if self._has_pending_changes is not True:
+                return
+            with open(self.cache_filepath, 'w+') as cache_file:
+                json.dump({'version': self.VERSION, 'entries': self._entries}, cache_file, indent=2, sort_keys=True)
+            self._has_pending_changes = False
+
+    @staticmethod
+    def make_key(namespace: str, inputs_filepaths: Iterable[str]) -> str:
+        # The key is built from the content of the inputs of the test and from the versions of the packages
+        # running it, and not from the paths or mtimes of the files, so that moving or touching a sample
+        # does not invalidate its result, while upgrading StructNoSQL runs all the tests again.
+        key_hash = hashlib.sha1(namespace.encode('utf-8'))
+        key_hash.update(json.dumps(get_environment_versions(), sort_keys=True).encode('utf-8'))
+        for input_filepath in inputs_filepaths:
+            with open(input_filepath, 'rb') as input_file:
+                key_hash.update(hashlib.sha1(input_file.read()).digest())
+        return key_hash.hexdigest()
+
+    def get(self, key: str) -> Optional[TestResult]:
+        with self._lock:
+            entry: Optional[dict] = self._entries.get(key, None) if self.force is not True else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return TestResult(passed=entry['passed'], output=entry['output'])
+
+    def set(self, key: str, result: TestResult):
+        with self._lock:
+            entry = {'passed': result.passed, 'output': result.output}
+            if self._entries.get(key, None) != entry:
+                self._entries[key] = entry
+                self._has_pending_changes = True
@@ -5,6 +5,8 @@ import os
 
 
 class FileImportTransformer(BaseTransformer):
+    cacheable = True
+
     def __init__(self, runner: Runner, source_filepath: str, attribute: Optional[str]):
         super().__init__(runner=runner, source_filepath=source_filepath, attribute=attribute)
 
@@ -12,9 +14,7 @@ class FileImportTransformer(BaseTransformer):
         if not os.path.isfile(self.attribute):
             raise Exception(f"File not found at {self.attribute}")
 
-        self.runner.files_dependencies.add_dependency(
-            parent_filepath=self.source_filepath,
-            dependency_path=self.attribute
+        self.register_dependency(dependency_path=self.attribute)
+        return self.runner.render_included_content(
+            source_filepath=self.attribute, source_content=self.runner.content_store.read_text(self.attribute)
         )
-        with open(self.attribute, 'r') as file:
-            return file.read()
@@ -1,11 +1,12 @@
 import os
-import re
 from mdscript import Runner
 from mdscript.base_transformer import BaseTransformer
 from typing import Optional
 
 
 class FileTemplateTransformer(BaseTransformer):
+    cacheable = True
+
     def __init__(self, runner: Runner, source_filepath: str, attribute: Optional[str]):
         super().__init__(runner=runner, source_filepath=source_filepath, attribute=attribute)
         if not isinstance(self.evaluated_attribute, dict):
@@ -24,13 +25,7 @@ class FileTemplateTransformer(BaseTransformer):
         if not os.path.isfile(self.attributes_filepath):
             raise Exception(f"File not found at {self.attribute}")
 
-        self.runner.files_dependencies.add_dependency(
-            parent_filepath=self.source_filepath,
-            dependency_path=self.attributes_filepath
-        )
-        with open(self.attributes_filepath, 'r') as file:
-            altered_file_content: str = file.read()
-            for attribute_key, attribute_value in self.evaluated_attribute.items():
-                regex_pattern: str = "{{" + attribute_key + "}}"
-                altered_file_content = re.sub(regex_pattern, attribute_value, altered_file_content)
-            return altered_file_content
+        self.register_dependency(dependency_path=self.attributes_filepath)
+        compiled_template = self.runner.compiled_templates.get(template_filepath=self.attributes_filepath)
+        altered_file_content: str = compiled_template.render(values=self.evaluated_attribute, template_filepath=self.attributes_filepath)
+        return self.runner.render_included_content(source_filepath=self.attributes_filepath, source_content=altered_file_content)
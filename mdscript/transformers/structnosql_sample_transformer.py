@@ -1,27 +1,16 @@
 from mdscript import BaseTransformer, Runner
+from mdscript.sample_worker import run_sample, make_sample_worker_env
+from mdscript.tests_results_cache import TestsResultsCache, TestResult
 from typing import Optional
 import json
-import logging
 import os
-
-
-def make_user_table():
-    from StructNoSQL import TableDataModel, BasicTable, PrimaryIndex
-    class UsersTableModel(TableDataModel):
-        pass
-
-    class UsersTable(BasicTable):
-        def __init__(self):
-            primary_index = PrimaryIndex(hash_key_name='userId', hash_key_variable_python_type=str)
-            super().__init__(
-                table_name='accounts-data', region_name='eu-west-2',
-                data_model=UsersTableModel(), primary_index=primary_index,
-                auto_create_table=True
-            )
-    return UsersTable()
+import sys
 
 
 class StructNoSQLSampleTransformer(BaseTransformer):
+    cacheable = True
+    SAMPLE_FILENAMES = ('code.py', 'record.json', 'output.txt')
+
     def __init__(self, runner: Runner, source_filepath: str, attribute: Optional[str]):
         super().__init__(runner=runner, source_filepath=source_filepath, attribute=attribute)
         if self.attribute is None:
@@ -54,12 +43,8 @@ class StructNoSQLSampleTransformer(BaseTransformer):
         if not os.path.isfile(expected_filepath):
             raise Exception(f"File not found at {expected_filepath}")
 
-        self.runner.files_dependencies.add_dependency(
-            parent_filepath=self.source_filepath,
-            dependency_path=expected_filepath
-        )
-        with open(expected_filepath, 'r') as file:
-            return file.read()
+        self.register_dependency(dependency_path=expected_filepath)
+        return self.runner.content_store.read_text(expected_filepath)
 
     def get_record(self) -> str:
         return self.get_register_file_as_dependency('record.json')
@@ -70,28 +55,58 @@ class StructNoSQLSampleTransformer(BaseTransformer):
     def get_output(self) -> str:
         return self.get_register_file_as_dependency('output.txt')
 
-    def test(self) -> bool:
-        table_client = make_user_table()
-        record_data = json.loads(self.get_record())
-        put_record_success = table_client.dynamodb_client.put_record(item_dict=record_data)
-
-        import sys
-        from io import StringIO
-        stored_stdout = sys.stdout
-        sys.stdout = buffer = StringIO()
+    def _make_test_cache_key(self) -> Optional[str]:
+        if self.runner.tests_results_cache is None:
+            return None
+        return TestsResultsCache.make_key(
+            namespace=type(self).__name__,
+            inputs_filepaths=[os.path.join(self.dirpath, filename) for filename in self.SAMPLE_FILENAMES]
+        )
 
-        import importlib.util
-        expected_code_filepath = os.path.join(self.dirpath, 'code.py')
-        module_spec = importlib.util.spec_from_file_location("", expected_code_filepath)
-        module = importlib.util.module_from_spec(module_spec)
-        module_spec.loader.exec_module(module)
+    def _get_cached_test_result(self, cache_key: Optional[str]) -> Optional[TestResult]:
+        if cache_key is None:
+            return None
+        cached_result: Optional[TestResult] = self.runner.tests_results_cache.get(key=cache_key)
+        if cached_result is not None:
+            print(f"Using the cached output of the sample at {self.dirpath}")
+        return cached_result
 
-        result = buffer.getvalue()
-        result = result.strip('\nNone\n')
-        buffer.close()
+    def _check_and_cache_sample_output(self, result: str, cache_key: Optional[str]) -> bool:
+        passed = self._check_sample_output(result=result)
+        if cache_key is not None:
+            self.runner.tests_results_cache.set(key=cache_key, result=TestResult(passed=passed, output=result))
+        return passed
 
-        sys.stdout = stored_stdout
+    def test(self) -> bool:
+        cache_key = self._make_test_cache_key()
+        cached_result: Optional[TestResult] = self._get_cached_test_result(cache_key=cache_key)
+        if cached_result is not None:
+            return self._check_sample_output(result=cached_result.output)
+        result = run_sample(sample_dirpath=self.dirpath)
+        return self._check_and_cache_sample_output(result=result, cache_key=cache_key)
+
+    async def atest(self) -> bool:
+        cache_key = self._make_test_cache_key()
+        cached_result: Optional[TestResult] = self._get_cached_test_result(cache_key=cache_key)
+        if cached_result is not None:
+            return self._check_sample_output(result=cached_result.output)
+        # The samples are redirecting the sys.stdout while they run, so to be tested concurrently, each
+        # of them is run in its own worker subprocess, which writes its output as json on its last line.
+        import asyncio
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, '-m', 'mdscript.sample_worker', os.path.abspath(self.dirpath), cwd=self.dirpath,
+            env=make_sample_worker_env(), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            # A sample that could not run has no output to compare, so nothing is cached for it.
+            print(f"Sample failed at {self.dirpath} : {stderr.decode('utf-8').strip()}")
+            return False
+        result: str = json.loads(stdout.decode('utf-8').rstrip('\n').split('\n')[-1])['output']
+        return self._check_and_cache_sample_output(result=result, cache_key=cache_key)
 
+    def _check_sample_output(self, result: str) -> bool:
+        expected_code_filepath = os.path.join(self.dirpath, 'code.py')
         expected_output = self.get_output()
         if result != expected_output:
             print(f"Expected output did not match : {result} vs {expected_output}")
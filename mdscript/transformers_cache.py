@@ -0,0 +1,90 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple, Iterable, NamedTuple
+
+
+class TransformersCacheEntry(NamedTuple):
+    content: str
+    dependencies_paths: Tuple[str, ...]
+    dependencies_mtimes: Dict[str, Optional[int]]
+
+
+def get_filepath_mtime(filepath: str) -> Optional[int]:
+    try:
+        return os.stat(filepath).st_mtime_ns
+    except OSError:
+        return None
+
+
+class TransformersCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: Dict[Tuple[str, str], TransformersCacheEntry] = OrderedDict()
+        self._dependencies_to_keys: Dict[str, Set[Tuple[str, str]]] = dict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[TransformersCacheEntry]:
+        with self._lock:
+            entry: Optional[TransformersCacheEntry] = self._entries.get(key, None)
+            if entry is not None:
+                for dependency_path, dependency_mtime in entry.dependencies_mtimes.items():
+                    if get_filepath_mtime(dependency_path) != dependency_mtime:
+                        # The watcher should have invalidated the entry, but a file can also be modified
+                        # while no watcher is running, so we never trust an entry with outdated mtimes.
+                        self._remove(key=key)
+                        entry = None
+                        break
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: Tuple[str, str], content: str, dependencies_paths: Iterable[str], validation_paths: Iterable[str]):
+        # The dependencies_paths are the files directly used by the transformer, where as the validation_paths
+        # also contains their own dependencies, since any change in them can alter the transformer output.
+        dependencies_paths: Tuple[str, ...] = tuple(dependencies_paths)
+        entry = TransformersCacheEntry(
+            content=content, dependencies_paths=dependencies_paths, dependencies_mtimes={
+                dependency_path: get_filepath_mtime(dependency_path)
+                for dependency_path in {*dependencies_paths, *validation_paths}
+            }
+        )
+        with self._lock:
+            self._remove(key=key)
+            self._entries[key] = entry
+            for dependency_path in entry.dependencies_mtimes.keys():
+                if dependency_path not in self._dependencies_to_keys:
+                    self._dependencies_to_keys[dependency_path] = {key}
+                else:
+                    self._dependencies_to_keys[dependency_path].add(key)
+
+            while len(self._entries) > self.max_size:
+                least_recently_used_key = next(iter(self._entries))
+                self._remove(key=least_recently_used_key)
+
+    def _remove(self, key: Tuple[str, str]):
+        entry: Optional[TransformersCacheEntry] = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for dependency_path in entry.dependencies_mtimes.keys():
+            dependency_keys: Optional[Set[Tuple[str, str]]] = self._dependencies_to_keys.get(dependency_path, None)
+            if dependency_keys is not None:
+                dependency_keys.discard(key)
+                if not len(dependency_keys) > 0:
+                    del self._dependencies_to_keys[dependency_path]
+
+    def invalidate_dependency(self, dependency_path: str):
+        with self._lock:
+            for key in list(self._dependencies_to_keys.get(dependency_path, set())):
+                self._remove(key=key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dependencies_to_keys.clear()
@@ -1,11 +1,11 @@
 import os
+import threading
 import time
 import logging
 from pathlib import Path
-from typing import Set, Dict
+from typing import Set, Dict, Optional, Any
 
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from mdscript.render_queue import DebouncedRenderQueue, DebouncedTestsQueue
 
 
 def process_src_path(src_path: str) -> str:
@@ -14,84 +14,115 @@ def process_src_path(src_path: str) -> str:
     return src_path
 
 
-class BaseWatcherEventHandler(FileSystemEventHandler):
-    def __init__(self, runner):
-        super().__init__()
-        self.runner = runner
-        self.logger = logging.root
-
-    def on_moved(self, event):
-        super().on_moved(event)
-        object_type = 'directory' if event.is_directory else 'file'
-        self.logger.info("Moved %s: from %s to %s", object_type, event.src_path, event.dest_path)
-
-    def on_created(self, event):
-        super().on_created(event)
-        object_type = 'directory' if event.is_directory else 'file'
-        self.logger.info("Created %s: %s", object_type, event.src_path)
-
-    def on_deleted(self, event):
-        super().on_deleted(event)
-        object_type = 'directory' if event.is_directory else 'file'
-        self.logger.info("Deleted %s: %s", object_type, event.src_path)
-
-    def run_if_file_name_valid(self, unprocessed_filepath: str):
-        filepath = Path(unprocessed_filepath)
-        if filepath.suffix == '.md' and filepath.parts[-1][0:2] == '__':
-            self.runner._run_with_filepath(source_filepath=unprocessed_filepath, run_test=False)
-
-    def confirm_modified(self, event, source_filepath: str):
-        dependencies_filepaths = self.runner.files_dependencies.dependencies_to_parents.get(source_filepath, None)
-        if dependencies_filepaths is not None:
-            for dependency_filepath in dependencies_filepaths:
-                self.run_if_file_name_valid(dependency_filepath)
+def is_source_filepath(unprocessed_filepath: str) -> bool:
+    filepath = Path(unprocessed_filepath)
+    return filepath.suffix == '.md' and filepath.parts[-1][0:2] == '__'
 
-        self.run_if_file_name_valid(source_filepath)
 
-        object_type = 'directory' if event.is_directory else 'file'
-        self.logger.info("Modified %s: %s", object_type, event.src_path)
-
-
-class FolderWatcherEventHandler(BaseWatcherEventHandler):
-    def on_modified(self, event):
-        super().on_modified(event)
-        source_filepath = process_src_path(src_path=event.src_path)
-        self.confirm_modified(event=event, source_filepath=source_filepath)
-
-
-class DirectoryFilesWatcherEventHandler(BaseWatcherEventHandler):
-    def __init__(self, runner, watched_files: Set[str]):
-        super().__init__(runner=runner)
-        self.watched_files = watched_files
-
-    def on_modified(self, event):
-        super().on_modified(event)
-        source_filepath = process_src_path(src_path=event.src_path)
-        if source_filepath in self.watched_files:
-            self.confirm_modified(event=event, source_filepath=source_filepath)
+def normalize_path(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
 
 
 class Watcher:
     def __init__(self, runner):
         self.runner = runner
-        self.observer = Observer()
-        self.directory_files_watchers: Dict[str, DirectoryFilesWatcherEventHandler] = dict()
+        self.observer: Optional[Any] = None
+        self.event_handler: Optional[Any] = None
+        # The observer and its event handler are only created when the watcher starts, so that the builds which
+        # do not watch the files never import watchdog. A single event handler is shared by all the watched
+        # directories. The events are routed with a lookup in the watched files index, which maps the
+        # normalized paths to the paths the files were registered with.
+        self._normalized_base_dirpath: str = normalize_path(self.runner.base_dirpath)
+        self._watched_files: Dict[str, Set[str]] = dict()
+        self._watched_directories: Dict[str, Optional[Any]] = dict()
+        # Maps the directories outside of the base_dirpath to their ObservedWatch, which is None until the observer starts.
+        self._lock = threading.Lock()
+        self.render_queue = DebouncedRenderQueue(
+            runner=self.runner,
+            debounce_seconds=self.runner.config.watch_debounce_seconds,
+            max_delay_seconds=self.runner.config.watch_max_delay_seconds
+        )
+        self.tests_queue: Optional[DebouncedTestsQueue] = None
+        # Only created when watching with the tests, to run the tests of the files affected by each modification.
+
+    def start_observer(self, run_tests: bool = False):
+        from watchdog.observers import Observer
+        from mdscript.watcher_event_handlers import DispatcherEventHandler
 
-    def start(self):
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-        self.observer.schedule(event_handler=FolderWatcherEventHandler(runner=self.runner), path=self.runner.base_dirpath, recursive=True)
+        with self._lock:
+            self.observer = Observer()
+            self.event_handler = DispatcherEventHandler(runner=self.runner, watcher=self)
+            self.observer.schedule(event_handler=self.event_handler, path=self.runner.base_dirpath, recursive=True)
+            for normalized_dirpath in self._watched_directories.keys():
+                self._watched_directories[normalized_dirpath] = self.observer.schedule(
+                    event_handler=self.event_handler, path=normalized_dirpath, recursive=False
+                )
+        if run_tests is True:
+            self.tests_queue = DebouncedTestsQueue(
+                runner=self.runner,
+                debounce_seconds=self.runner.config.watch_debounce_seconds,
+                max_delay_seconds=self.runner.config.watch_max_delay_seconds
+            )
+            self.tests_queue.start()
+        self.render_queue.start()
         self.observer.start()
+
+    def stop_observer(self):
+        self.observer.stop()
+        self.render_queue.stop()
+        if self.tests_queue is not None:
+            self.tests_queue.stop()
+            self.tests_queue = None
+
+    def start(self, run_tests: bool = False):
+        self.start_observer(run_tests=run_tests)
         try:
             while True:
                 time.sleep(0.5)
         except KeyboardInterrupt:
-            self.observer.stop()
+            self.stop_observer()
+
+    def _is_in_base_dirpath(self, normalized_path: str) -> bool:
+        return normalized_path == self._normalized_base_dirpath or normalized_path.startswith(self._normalized_base_dirpath + os.sep)
+
+    def get_event_filepaths(self, source_filepath: str) -> Set[str]:
+        normalized_filepath = normalize_path(source_filepath)
+        with self._lock:
+            event_filepaths: Set[str] = set(self._watched_files.get(normalized_filepath, set()))
+        if self._is_in_base_dirpath(normalized_filepath):
+            # All the files in the base_dirpath are watched, even if they are not the dependency of any file. They are
+            # spelled like the scan of the base_dirpath registers them, since a path spelled differently, like an
+            # absolute path sent to the daemon, would be a second manifest entry and parent for the same file.
+            event_filepaths.add(self.get_base_dirpath_filepath(filepath=source_filepath))
+        return event_filepaths
+
+    def get_base_dirpath_filepath(self, filepath: str) -> str:
+        relative_filepath = os.path.relpath(os.path.abspath(filepath), os.path.abspath(self.runner.base_dirpath))
+        return os.path.join(self.runner.base_dirpath, relative_filepath) if relative_filepath != os.curdir else self.runner.base_dirpath
 
     def add_file_watch(self, filepath: str):
-        dirpath = os.path.dirname(filepath)
-        existing_directory_files_watcher = self.directory_files_watchers.get(dirpath, None)
-        if existing_directory_files_watcher is not None:
-            existing_directory_files_watcher.watched_files.add(filepath)
-        else:
-            event_handler = DirectoryFilesWatcherEventHandler(runner=self.runner, watched_files={filepath})
-            self.observer.schedule(event_handler=event_handler, path=dirpath, recursive=False)
+        normalized_filepath = normalize_path(filepath)
+        with self._lock:
+            registered_filepaths: Optional[Set[str]] = self._watched_files.get(normalized_filepath, None)
+            if registered_filepaths is not None:
+                registered_filepaths.add(filepath)
+                return
+            self._watched_files[normalized_filepath] = {filepath}
+
+            normalized_dirpath = os.path.dirname(normalized_filepath)
+            if normalized_dirpath in self._watched_directories or self._is_in_base_dirpath(normalized_dirpath):
+                # The base_dirpath is already recursively watched, and we only schedule each other directory once.
+                return
+            self._watched_directories[normalized_dirpath] = None
+            observer = self.observer
+            if observer is None:
+                # The directory will be scheduled by start_observer.
+                return
+
+        # Scheduled without our lock, since the observer holds its own lock while dispatching the events to the
+        # handler, which takes our lock in get_event_filepaths. The directory is already in the watched directories,
+        # so it cannot be scheduled twice by the threads adding the watches of other files of the same directory.
+        observed_watch = observer.schedule(event_handler=self.event_handler, path=normalized_dirpath, recursive=False)
+        with self._lock:
+            self._watched_directories[normalized_dirpath] = observed_watch
@@ -0,0 +1,69 @@
+import logging
+from typing import List
+
+from watchdog.events import FileSystemEventHandler
+
+from mdscript.watcher import Watcher, process_src_path
+
+
+class BaseWatcherEventHandler(FileSystemEventHandler):
+    def __init__(self, runner):
+        super().__init__()
+        self.runner = runner
+        self.logger = logging.root
+
+    def on_moved(self, event):
+        super().on_moved(event)
+        object_type = 'directory' if event.is_directory else 'file'
+        self.logger.info("Moved %s: from %s to %s", object_type, event.src_path, event.dest_path)
+
+    def on_created(self, event):
+        super().on_created(event)
+        object_type = 'directory' if event.is_directory else 'file'
+        self.logger.info("Created %s: %s", object_type, event.src_path)
+
+    def on_deleted(self, event):
+        super().on_deleted(event)
+        object_type = 'directory' if event.is_directory else 'file'
+        self.logger.info("Deleted %s: %s", object_type, event.src_path)
+
+    def confirm_modified(self, event, source_filepath: str):
+        filepaths_to_render: List[str] = self.runner.collect_files_to_render(modified_filepath=source_filepath)
+        if len(filepaths_to_render) > 0:
+            self.runner.watcher.render_queue.push(filepaths_to_render)
+            # The files are not rendered right away, the queue will render each of them only once per burst of events.
+            if self.runner.watcher.tests_queue is not None:
+                self.runner.watcher.tests_queue.push(filepaths_to_render)
+
+        object_type = 'directory' if event.is_directory else 'file'
+        self.logger.info("Modified %s: %s", object_type, event.src_path)
+
+
+class DispatcherEventHandler(BaseWatcherEventHandler):
+    def __init__(self, runner, watcher: Watcher):
+        super().__init__(runner=runner)
+        self.watcher = watcher
+
+    def is_path_ignored(self, path: str) -> bool:
+        # The editors backups are mapped to the file they are saving before being matched, like in on_modified.
+        path = process_src_path(src_path=path)
+        # An output that is still exactly the one we wrote can only be an event of our own write. An output
+        # modified by hand no longer matches what we wrote, and goes through the pipeline like any other file.
+        return self.runner.config.is_watch_ignored(path) or self.runner.output_writer.is_own_write(output_filepath=path)
+
+    def dispatch(self, event):
+        event_paths = [path for path in (event.src_path, getattr(event, 'dest_path', '')) if len(path) > 0]
+        if all(self.is_path_ignored(path) for path in event_paths):
+            # Our temporary and written outputs, the build manifest, the __pycache__ of the samples and the swap files
+            # of the editors are dropped before being logged or routed, so they never cause any work in the Runner.
+            return
+        super().dispatch(event)
+
+    def on_modified(self, event):
+        super().on_modified(event)
+        if event.is_directory:
+            # A directory is modified when its files are created, moved or deleted, which have their own events.
+            return
+        source_filepath = process_src_path(src_path=event.src_path)
+        for watched_filepath in self.watcher.get_event_filepaths(source_filepath=source_filepath):
+            self.confirm_modified(event=event, source_filepath=watched_filepath)
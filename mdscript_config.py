@@ -1,14 +1,18 @@
+import os
+
 from mdscript.config import MDScriptConfig
-from mdscript.runner import Runner
 from mdscript.transformers import FileImportTransformer, FileTemplateTransformer, StructNoSQLSampleTransformer
 
-Runner(
-    MDScriptConfig(
-        transformers={
-            'sampler': StructNoSQLSampleTransformer,
-            'file': FileImportTransformer,
-            'template': FileTemplateTransformer
-        }
-    ),
-    base_dirpath='F:/Inoft/StructNoSQL_docs/docs'
-).start()
+config = MDScriptConfig(
+    transformers={
+        'sampler': StructNoSQLSampleTransformer,
+        'file': FileImportTransformer,
+        'template': FileTemplateTransformer
+    }
+)
+base_dirpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'docs')
+# Used by the mdscript cli (python -m mdscript.cli build), which loads this file without starting the Runner.
+
+if __name__ == '__main__':
+    from mdscript.runner import Runner
+    Runner(config, base_dirpath=base_dirpath).start()